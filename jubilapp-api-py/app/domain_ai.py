@@ -4,6 +4,8 @@ from functools import lru_cache
 from typing import Dict, List, Optional, Sequence, Tuple
 import unicodedata
 
+import numpy as np
+
 from app.domain_preparation import validate_level
 from app.domain_mobility import ALLOWED_MOBILITY_LEVELS, validate_mobility_level
 from app.services.huggingface import (
@@ -93,13 +95,13 @@ def _interest_suggestions(answers: Sequence[str], top_k: int) -> List[Dict]:
     if len(answer_vectors) != len(cleaned):
         raise HuggingFaceRequestError("No se pudieron generar embeddings de las respuestas")
 
-    catalog_vectors = load_interest_embeddings()
+    catalog_rows, catalog_matrix = load_interest_embeddings()
+    answers_matrix = np.asarray(answer_vectors, dtype=np.float32)
+    best_scores = (catalog_matrix @ answers_matrix.T).max(axis=1)
 
-    scored: List[Tuple[float, InterestRow]] = []
-    for row, vec in catalog_vectors:
-        sims = [_dot(vec, ans) for ans in answer_vectors]
-        best = max(sims) if sims else -1.0
-        scored.append((best, row))
+    scored: List[Tuple[float, InterestRow]] = [
+        (float(score), row) for score, row in zip(best_scores, catalog_rows)
+    ]
 
     scored.sort(key=lambda item: item[0], reverse=True)
 
@@ -15,6 +15,9 @@ from app.routers import recommendations as recommendations_router
 from app.routers import admin as admin_router
 from app.database import Base, engine
 from app.services.catalog_embeddings import ensure_catalog_embeddings
+from app.services import events_ics, geocoding, voice
+from app.services import user_interests
+import threading
 # Importa modelos para registrar las tablas en el metadata
 from app import models_interests  # noqa: F401
 
@@ -29,6 +32,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_scoped_caches(request, call_next):
+    token = user_interests.start_request_cache()
+    try:
+        return await call_next(request)
+    finally:
+        user_interests.end_request_cache(token)
+
 @app.on_event("startup")
 def init_tables():
     try:
@@ -41,6 +52,13 @@ def init_tables():
     except Exception:
         # En dev preferimos no tumbar la app si HuggingFace/Firebase falla al iniciar
         pass
+    # Abre el canal de Speech-to-Text en segundo plano para no pagar el handshake en la primera request
+    threading.Thread(target=voice.warm_up_client, daemon=True).start()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await events_ics.aclose_client()
+    await geocoding.aclose_client()
 
 @app.get("/health")
 def health():
@@ -37,6 +37,12 @@ from app.services.activity_reports import (
 )
 from app.services.user_interests import get_user_interest_names
 
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - dependencia opcional
+    def njit(*_args, **_kwargs):  # type: ignore[no-redef]
+        return lambda func: func
+
 
 router = APIRouter(prefix="/activities", tags=["Activities"])
 
@@ -107,6 +113,7 @@ def _to_rating(value: Optional[object]) -> Optional[int]:
     return None
 
 
+@njit(cache=True, fastmath=True)
 def _haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
     radius = 6371.0
     dlat = radians(lat2 - lat1)
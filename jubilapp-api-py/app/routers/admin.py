@@ -11,7 +11,7 @@ from app.security import is_admin_user, require_admin, verify_firebase_token
 from app.services.admin_stats import (
     EXPORT_FORMATS,
     compute_admin_stats,
-    stats_to_csv,
+    iter_stats_csv,
     stats_to_pdf,
 )
 
@@ -190,9 +190,8 @@ def export_statistics(
     filename = f"jubilapp_stats_{resolved_start.isoformat()}_{resolved_end.isoformat()}.{format}"
 
     if format == "csv":
-        payload = stats_to_csv(stats).encode("utf-8")
         return StreamingResponse(
-            io.BytesIO(payload),
+            iter_stats_csv(stats),
             media_type="text/csv; charset=utf-8",
             headers={
                 "Content-Disposition": f'attachment; filename="{filename}"',
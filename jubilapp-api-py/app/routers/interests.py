@@ -9,7 +9,7 @@ from app.schemas_interests import (
 from app.security import verify_firebase_token
 from app.firebase import db as fs
 from google.cloud.firestore_v1 import SERVER_TIMESTAMP
-from app.services.interests_catalog import load_catalog, ensure_catalog_firestore
+from app.services.interests_catalog import load_catalog, ensure_catalog_firestore, invalidate_catalog_cache
 
 
 router = APIRouter(prefix="/interests", tags=["Interests"])
@@ -107,6 +107,7 @@ def set_my_interests_by_names(
                 next_id += 1
             batch.commit()
             # recargar
+            invalidate_catalog_cache()
             catalog_list = load_catalog()
             by_name = {c["name"]: c for c in catalog_list}
 
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import queue
+from typing import List, Optional
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from firebase_admin import firestore
 
+from app.firebase import verify_id_token
 from app.security import get_current_uid
-from app.services.voice import AudioUploadResult, TranscriptionError, transcribe_audio_bytes, upload_audio_bytes
+from app.services.voice import (
+    AudioUploadResult,
+    TranscriptionError,
+    stream_transcribe,
+    transcribe_audio_bytes,
+    upload_audio_bytes,
+)
 from app.services.interviews import save_turn
 
 logger = logging.getLogger(__name__)
@@ -35,7 +46,8 @@ async def transcribe_audio(
     upload_error: str | None = None
     uploaded: AudioUploadResult = AudioUploadResult(storage_path=None, signed_url=None)
     try:
-        uploaded = upload_audio_bytes(
+        uploaded = await run_in_threadpool(
+            upload_audio_bytes,
             uid,
             sid,
             data=raw,
@@ -50,7 +62,14 @@ async def transcribe_audio(
         logger.exception("Error inesperado subiendo audio para %s/%s", uid, sid)
 
     try:
-        transcript = transcribe_audio_bytes(raw, sample_rate_hz=sample_rate_hz, mime_type=mime_type)
+        # Puede esperar una operación long-running: fuera del event loop
+        transcript = await run_in_threadpool(
+            transcribe_audio_bytes,
+            raw,
+            sample_rate_hz=sample_rate_hz,
+            mime_type=mime_type,
+            storage_path=uploaded.storage_path,
+        )
     except TranscriptionError as exc:
         logger.warning("Fallo transcribiendo audio para %s/%s: %s", uid, sid, exc)
         raise HTTPException(status_code=502, detail=str(exc))
@@ -69,7 +88,7 @@ async def transcribe_audio(
     if upload_error:
         turn["upload_error"] = upload_error
     try:
-        save_turn(uid, sid, turn)
+        await run_in_threadpool(save_turn, uid, sid, turn)
     except Exception as exc:
         logger.warning("No se pudo guardar turn en Firestore para %s/%s: %s", uid, sid, exc)
 
@@ -80,3 +99,89 @@ async def transcribe_audio(
         "audio_path": uploaded.storage_path,
         "upload_error": upload_error,
     }
+
+
+@router.websocket("/stream")
+async def stream_transcription(
+    websocket: WebSocket,
+    question_id: str,
+    question_text: str,
+    session_id: Optional[str] = None,
+    sample_rate_hz: Optional[int] = None,
+    mime_type: Optional[str] = None,
+):
+    """
+    Transcripción en vivo: el cliente envía frames binarios de audio y el texto
+    "end" al terminar. Se responden resultados parciales y finales en JSON.
+    """
+    try:
+        uid = verify_id_token(websocket.headers.get("authorization") or "")
+    except Exception:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    sid = session_id or uuid4().hex
+    loop = asyncio.get_running_loop()
+    audio_queue: "queue.Queue[Optional[bytes]]" = queue.Queue()
+    final_parts: List[str] = []
+
+    def _recognize() -> None:
+        # Puente hilo -> event loop: streaming_recognize es bloqueante (gRPC).
+        chunks = iter(audio_queue.get, None)
+        for text, is_final in stream_transcribe(chunks, sample_rate_hz=sample_rate_hz, mime_type=mime_type):
+            if is_final:
+                final_parts.append(text)
+            try:
+                asyncio.run_coroutine_threadsafe(
+                    websocket.send_json({"session_id": sid, "text": text, "final": is_final}),
+                    loop,
+                ).result()
+            except Exception:  # cliente desconectado: se sigue juntando el texto final
+                pass
+
+    worker = loop.run_in_executor(None, _recognize)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message.get("type") == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                audio_queue.put(message["bytes"])
+            elif (message.get("text") or "").strip().lower() == "end":
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        audio_queue.put(None)
+
+    try:
+        await worker
+    except TranscriptionError as exc:
+        logger.warning("Fallo transcribiendo stream para %s/%s: %s", uid, sid, exc)
+        await websocket.close(code=1011, reason=str(exc)[:120])
+        return
+    except Exception:
+        logger.exception("Error inesperado en stream de audio para %s/%s", uid, sid)
+        await websocket.close(code=1011)
+        return
+
+    transcript = " ".join(part for part in final_parts if part).strip()
+    if transcript:
+        try:
+            await run_in_threadpool(save_turn, uid, sid, {
+                "question_id": question_id,
+                "question": question_text,
+                "transcript": transcript,
+                "audio_path": None,
+                "audio_url": None,
+                "created_at": firestore.SERVER_TIMESTAMP,
+            })
+        except Exception as exc:
+            logger.warning("No se pudo guardar turn en Firestore para %s/%s: %s", uid, sid, exc)
+
+    try:
+        await websocket.send_json({"session_id": sid, "text": transcript, "final": True, "done": True})
+        await websocket.close()
+    except Exception:  # el cliente pudo haberse desconectado
+        pass
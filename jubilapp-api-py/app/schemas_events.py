@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 
 class Venue(BaseModel):
@@ -31,6 +32,9 @@ class EventItem(BaseModel):
     venue: Optional[Venue] = None
     source: str
 
+    # start_utc ya parseado; lo completa el parser ICS para no re-parsear en cada filtro.
+    _start_dt: Optional[datetime] = PrivateAttr(default=None)
+
     model_config = {
         "populate_by_name": True,
         "extra": "forbid",
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
-from collections import Counter, defaultdict
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime, time, timedelta, timezone
+import hashlib
 import io
 import logging
-from typing import Dict, Iterable, List, Optional, Tuple
+import os
+import threading
+from time import monotonic
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+from cachetools import TTLCache
 from firebase_admin import firestore
 from google.api_core.exceptions import FailedPrecondition
 try:
@@ -28,14 +34,39 @@ DEFAULT_TOP_LIMIT = 5
 EXPORT_FORMATS = ["csv"] + (["pdf"] if FPDF else [])
 _MONTH_LABELS = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
 
+# Campos de fecha en orden de prioridad para ubicar una actividad completada.
+_DATE_FIELDS = ("completedAt", "completed_at", "dateTime", "date_time", "createdAt")
+# Campos que compute_admin_stats lee de cada registro de historial.
+_HISTORY_FIELDS = [
+    *_DATE_FIELDS,
+    "category",
+    "title",
+    "activityId",
+    "activity_id",
+]
+_HISTORY_MAX_WORKERS = 16
+_USER_IDS_TTL_SECONDS = 300
+_USE_COLLECTION_GROUP = (os.getenv("ADMIN_STATS_COLLECTION_GROUP") or "").strip().lower() in {"1", "true", "yes", "on"}
+_user_ids_cache: Tuple[float, List[str]] = (0.0, [])
+_user_ids_lock = threading.Lock()
+
+# Caché de resultados: en memoria y persistida en `admin_stats_cache/{hash}`.
+# Subir _STATS_CACHE_VERSION cuando cambie la forma de calcular las métricas.
+_STATS_CACHE_COLLECTION = "admin_stats_cache"
+_STATS_CACHE_VERSION = 1
+_STATS_CACHE_TTL_SECONDS = 300
+_stats_cache: TTLCache = TTLCache(maxsize=64, ttl=_STATS_CACHE_TTL_SECONDS)
+_stats_cache_lock = threading.Lock()
+
 logger = logging.getLogger(__name__)
 
 
 def _to_datetime(value: object) -> Optional[datetime]:
-    if value is None:
-        return None
+    # Firestore devuelve DatetimeWithNanoseconds (subclase de datetime): isinstance primero.
     if isinstance(value, datetime):
         return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if value is None:
+        return None
     if hasattr(value, "to_datetime"):
         dt = value.to_datetime()  # type: ignore[attr-defined]
         return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
@@ -74,7 +105,35 @@ def _latin(text: str) -> str:
     return text.encode("latin-1", "replace").decode("latin-1")
 
 
-def _activity_history_stream(start_dt: datetime, end_dt: datetime):
+def _user_ids() -> List[str]:
+    """Lista los uid con documento en `users`, cacheada unos minutos."""
+    global _user_ids_cache
+    expires_at, cached = _user_ids_cache
+    if cached and expires_at > monotonic():
+        return cached
+    # Un solo hilo recarga la lista; los demás esperan y reutilizan el resultado.
+    with _user_ids_lock:
+        expires_at, cached = _user_ids_cache
+        if cached and expires_at > monotonic():
+            return cached
+        uids = [ref.id for ref in db.collection("users").list_documents()]
+        _user_ids_cache = (monotonic() + _USER_IDS_TTL_SECONDS, uids)
+    return uids
+
+
+def _user_history_in_range(uid: str, start_dt: datetime, end_dt: datetime) -> list:
+    query = (
+        db.collection("users")
+        .document(uid)
+        .collection("activityHistory")
+        .where("completedAt", ">=", start_dt)
+        .where("completedAt", "<=", end_dt)
+        .select(_HISTORY_FIELDS)
+    )
+    return list(query.stream())
+
+
+def _collection_group_stream(start_dt: datetime, end_dt: datetime):
     """
     Yields (is_fallback, snapshot) tuples. If Firestore complains about missing
     collection-group indexes we fall back to streaming the full collection and
@@ -83,7 +142,7 @@ def _activity_history_stream(start_dt: datetime, end_dt: datetime):
     base_query = db.collection_group("activityHistory")
     filtered_query = base_query.where("completedAt", ">=", start_dt).where("completedAt", "<=", end_dt)
     try:
-        for snapshot in filtered_query.stream():
+        for snapshot in filtered_query.select(_HISTORY_FIELDS).stream():
             yield False, snapshot
         return
     except FailedPrecondition as exc:
@@ -93,107 +152,204 @@ def _activity_history_stream(start_dt: datetime, end_dt: datetime):
         # Propagate non-index errors.
         raise
 
-    for snapshot in base_query.stream():
+    for snapshot in base_query.select(_HISTORY_FIELDS).stream():
         yield True, snapshot
 
 
+def _activity_history_stream(start_dt: datetime, end_dt: datetime):
+    """
+    Yields (is_fallback, snapshot) tuples. By default queries each user's
+    activityHistory in parallel so Firestore filters by completedAt using its
+    single-field index; ADMIN_STATS_COLLECTION_GROUP=1 restores the
+    collection-group scan.
+    """
+    if _USE_COLLECTION_GROUP:
+        yield from _collection_group_stream(start_dt, end_dt)
+        return
+
+    uids = _user_ids()
+    if not uids:
+        return
+    with ThreadPoolExecutor(max_workers=min(_HISTORY_MAX_WORKERS, len(uids))) as executor:
+        futures = [executor.submit(_user_history_in_range, uid, start_dt, end_dt) for uid in uids]
+        for future in as_completed(futures):
+            for snapshot in future.result():
+                yield False, snapshot
+
+
+def _stats_cache_key(start: date, end: date, top_limit: int) -> str:
+    raw = f"{start.isoformat()}|{end.isoformat()}|{top_limit}|v{_STATS_CACHE_VERSION}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _load_cached_stats(key: str) -> Optional[AdminStatsOut]:
+    try:
+        snapshot = db.collection(_STATS_CACHE_COLLECTION).document(key).get()
+    except Exception as exc:  # pragma: no cover - depende de Firestore
+        logger.warning("No se pudo leer la caché de estadísticas %s: %s", key, exc)
+        return None
+    if not snapshot.exists:
+        return None
+    data = snapshot.to_dict() or {}
+    expires_at = _to_datetime(data.get("expiresAt"))
+    if expires_at and expires_at <= datetime.now(timezone.utc):
+        return None
+    payload = data.get("payload")
+    if not isinstance(payload, dict):
+        return None
+    try:
+        return AdminStatsOut.model_validate(payload)
+    except Exception:
+        return None
+
+
+def _store_cached_stats(key: str, stats: AdminStatsOut, *, immutable: bool) -> None:
+    expires_at = None if immutable else stats.generated_at + timedelta(seconds=_STATS_CACHE_TTL_SECONDS)
+    try:
+        db.collection(_STATS_CACHE_COLLECTION).document(key).set(
+            {
+                "payload": stats.model_dump(mode="json"),
+                "version": _STATS_CACHE_VERSION,
+                "generatedAt": stats.generated_at,
+                "expiresAt": expires_at,
+            }
+        )
+    except Exception as exc:  # pragma: no cover - depende de Firestore
+        logger.warning("No se pudo guardar la caché de estadísticas %s: %s", key, exc)
+
+
+def _distinct_users_per_bucket(buckets: List[int], user_ids: List[int]) -> Counter[int]:
+    """Cuenta usuarios distintos por día/mes (ordinales) sin mantener un set de uids por bucket."""
+    pairs = {(bucket << 32) | user_id for bucket, user_id in zip(buckets, user_ids)}
+    return Counter(pair >> 32 for pair in pairs)
+
+
 def compute_admin_stats(
     start: date,
     end: date,
     *,
     top_limit: int = DEFAULT_TOP_LIMIT,
 ) -> AdminStatsOut:
+    """
+    Devuelve las estadísticas del rango usando la caché cuando es posible.
+    Los rangos que terminan antes de hoy no cambian y se guardan sin
+    expiración; los que incluyen hoy expiran a los pocos minutos.
+    """
     if start > end:
         raise ValueError("La fecha inicial no puede ser posterior a la final.")
     if (end - start).days + 1 > MAX_RANGE_DAYS:
         raise ValueError(f"El rango máximo permitido es de {MAX_RANGE_DAYS} días.")
 
+    top_limit = max(1, min(50, top_limit))
+    key = _stats_cache_key(start, end, top_limit)
+    with _stats_cache_lock:
+        cached = _stats_cache.get(key)
+    if cached is not None:
+        return cached.model_copy(deep=True)
+
+    stats = _load_cached_stats(key)
+    if stats is None:
+        stats = _compute_admin_stats(start, end, top_limit=top_limit)
+        # Las fechas de historial se agrupan en UTC: "hoy" también debe serlo.
+        _store_cached_stats(key, stats, immutable=end < datetime.now(timezone.utc).date())
+
+    with _stats_cache_lock:
+        _stats_cache[key] = stats
+    return stats.model_copy(deep=True)
+
+
+def _compute_admin_stats(
+    start: date,
+    end: date,
+    *,
+    top_limit: int,
+) -> AdminStatsOut:
     start_dt = datetime.combine(start, time.min, tzinfo=timezone.utc)
     end_dt = datetime.combine(end, time.max, tzinfo=timezone.utc)
 
-    daily_users: Dict[date, set[str]] = defaultdict(set)
-    daily_activity_counts: Counter[date] = Counter()
-    monthly_users: Dict[date, set[str]] = defaultdict(set)
-    category_counts: Counter[str] = Counter()
-    top_counts: Counter[str] = Counter()
+    # Columnas crudas: el bucle solo agrega escalares y las reducciones se
+    # hacen al final con Counter/set, que iteran en C. Días y meses se
+    # guardan como ordinales y cada uid como un índice entero, de modo que
+    # los pares únicos (día, usuario) y (mes, usuario) son un solo int.
+    start_ord = start.toordinal()
+    end_ord = end.toordinal()
+    uid_index: Dict[str, int] = {}
+    user_ids: List[int] = []
+    days: List[int] = []
+    months: List[int] = []
+    categories: List[str] = []
+    keys: List[str] = []
     top_meta: Dict[str, Tuple[Optional[str], str, Optional[str]]] = {}
 
-    total_activities = 0
-    unique_users: set[str] = set()
-
     for fallback_mode, snapshot in _activity_history_stream(start_dt, end_dt):
         data = snapshot.to_dict() or {}
-        completed_at = (
-            _to_datetime(data.get("completedAt"))
-            or _to_datetime(data.get("completed_at"))
-            or _to_datetime(data.get("dateTime"))
-            or _to_datetime(data.get("date_time"))
-            or _to_datetime(data.get("createdAt"))
-        )
+        completed_at = None
+        for field in _DATE_FIELDS:
+            value = data.get(field)
+            if value is not None:
+                completed_at = _to_datetime(value)
+                if completed_at:
+                    break
         if not completed_at:
             continue
         if fallback_mode and (completed_at < start_dt or completed_at > end_dt):
             continue
         completed_date = completed_at.date()
-        if completed_date < start or completed_date > end:
+        day_ord = completed_date.toordinal()
+        if day_ord < start_ord or day_ord > end_ord:
             continue
 
         uid = _owner_uid(snapshot)
         if not uid:
             continue
 
-        total_activities += 1
-        unique_users.add(uid)
-
-        daily_users[completed_date].add(uid)
-        daily_activity_counts[completed_date] += 1
-
-        month_key = completed_date.replace(day=1)
-        monthly_users[month_key].add(uid)
-
-        category = _normalize_category(data.get("category"))
-        category_counts[category] += 1
-
+        raw_category = data.get("category")
         title = str(data.get("title") or "").strip() or "Actividad sin título"
-        category_for_activity = str(data.get("category") or "").strip() or None
         activity_id = data.get("activityId") or data.get("activity_id")
         key = str(activity_id) if activity_id else f"title::{title.lower()}"
         if key not in top_meta:
+            category_for_activity = str(raw_category or "").strip() or None
             top_meta[key] = (activity_id if activity_id else None, title, category_for_activity)
-        top_counts[key] += 1
+
+        user_ids.append(uid_index.setdefault(uid, len(uid_index)))
+        days.append(day_ord)
+        months.append(day_ord - completed_date.day + 1)
+        categories.append(_normalize_category(raw_category))
+        keys.append(key)
+
+    total_activities = len(user_ids)
+    daily_activity_counts: Counter[int] = Counter(days)
+    daily_users = _distinct_users_per_bucket(days, user_ids)
+    monthly_users = _distinct_users_per_bucket(months, user_ids)
+    category_counts: Counter[str] = Counter(categories)
+    top_counts: Counter[str] = Counter(keys)
 
     total_days = (end - start).days + 1
-    sum_daily_active = sum(len(users) for users in daily_users.values())
-
-    daily_series: List[AdminStatsDailyPoint] = []
-    current_day = start
-    while current_day <= end:
-        daily_series.append(
-            AdminStatsDailyPoint(
-                date=current_day,
-                active_users=len(daily_users.get(current_day, set())),
-                activities=daily_activity_counts.get(current_day, 0),
-            )
+    sum_daily_active = sum(daily_users.values())
+
+    daily_series: List[AdminStatsDailyPoint] = [
+        AdminStatsDailyPoint(
+            date=date.fromordinal(day_ord),
+            active_users=daily_users.get(day_ord, 0),
+            activities=daily_activity_counts.get(day_ord, 0),
         )
-        current_day += timedelta(days=1)
+        for day_ord in range(start_ord, end_ord + 1)
+    ]
 
     monthly_series: List[AdminStatsMonthlyPoint] = []
-    for month_date in sorted(monthly_users.keys()):
+    for month_ord in sorted(monthly_users.keys()):
+        month_date = date.fromordinal(month_ord)
         label = _month_label(month_date)
         monthly_series.append(
             AdminStatsMonthlyPoint(
                 month=f"{month_date.year:04d}-{month_date.month:02d}",
                 label=label,
-                active_users=len(monthly_users[month_date]),
+                active_users=monthly_users[month_ord],
             )
         )
 
-    mau_current = 0
-    current_month_key = end.replace(day=1)
-    if current_month_key in monthly_users:
-        mau_current = len(monthly_users[current_month_key])
+    mau_current = monthly_users.get(end.replace(day=1).toordinal(), 0)
 
-    top_limit = max(1, min(50, top_limit))
     top_activities: List[AdminStatsTopActivity] = []
     for key, count in top_counts.most_common(top_limit):
         meta = top_meta.get(key)
@@ -223,11 +379,11 @@ def compute_admin_stats(
         range_end=end,
         total_days=total_days,
         total_activities=total_activities,
-        unique_users=len(unique_users),
+        unique_users=len(uid_index),
         days_with_activity=len(daily_users),
         average_activities_per_day=round(total_activities / total_days, 2) if total_days else 0.0,
         dau_average=round(sum_daily_active / total_days, 2) if total_days else 0.0,
-        dau_current=len(daily_users.get(end, set())),
+        dau_current=daily_users.get(end_ord, 0),
         mau_current=mau_current,
     )
 
@@ -242,50 +398,64 @@ def compute_admin_stats(
     )
 
 
-def stats_to_csv(stats: AdminStatsOut) -> str:
+def _drain(buffer: io.StringIO) -> str:
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
+
+
+def iter_stats_csv(stats: AdminStatsOut) -> Iterator[str]:
+    """Genera el CSV sección por sección para enviarlo con StreamingResponse."""
     import csv
 
     buffer = io.StringIO()
     writer = csv.writer(buffer)
 
     summary = stats.summary
-    writer.writerow(["Resumen"])
-    writer.writerow(["Generado", stats.generated_at.isoformat()])
-    writer.writerow(["Rango", f"{summary.range_start.isoformat()} → {summary.range_end.isoformat()}"])
-    writer.writerow(["Actividades totales", summary.total_activities])
-    writer.writerow(["Usuarios únicos", summary.unique_users])
-    writer.writerow(["Días con actividad", summary.days_with_activity])
-    writer.writerow(["Prom. actividades/día", summary.average_activities_per_day])
-    writer.writerow(["DAU promedio", summary.dau_average])
-    writer.writerow(["DAU (último día)", summary.dau_current])
-    writer.writerow(["MAU (mes actual)", summary.mau_current])
-
-    writer.writerow([])
-    writer.writerow(["Actividad diaria"])
-    writer.writerow(["Fecha", "Usuarios activos", "Actividades"])
-    for point in stats.daily_active:
-        writer.writerow([point.date.isoformat(), point.active_users, point.activities])
-
-    writer.writerow([])
-    writer.writerow(["Top actividades"])
-    writer.writerow(["Título", "Categoría", "Conteo", "% sobre total"])
-    for activity in stats.top_activities:
-        writer.writerow(
-            [
-                activity.title,
-                activity.category or "Sin categoría",
-                activity.count,
-                f"{activity.percentage:.2f}",
-            ]
+    writer.writerows(
+        [
+            ["Resumen"],
+            ["Generado", stats.generated_at.isoformat()],
+            ["Rango", f"{summary.range_start.isoformat()} → {summary.range_end.isoformat()}"],
+            ["Actividades totales", summary.total_activities],
+            ["Usuarios únicos", summary.unique_users],
+            ["Días con actividad", summary.days_with_activity],
+            ["Prom. actividades/día", summary.average_activities_per_day],
+            ["DAU promedio", summary.dau_average],
+            ["DAU (último día)", summary.dau_current],
+            ["MAU (mes actual)", summary.mau_current],
+        ]
+    )
+    yield _drain(buffer)
+
+    writer.writerows([[], ["Actividad diaria"], ["Fecha", "Usuarios activos", "Actividades"]])
+    writer.writerows(
+        (point.date.isoformat(), point.active_users, point.activities) for point in stats.daily_active
+    )
+    yield _drain(buffer)
+
+    writer.writerows([[], ["Top actividades"], ["Título", "Categoría", "Conteo", "% sobre total"]])
+    writer.writerows(
+        (
+            activity.title,
+            activity.category or "Sin categoría",
+            activity.count,
+            f"{activity.percentage:.2f}",
         )
+        for activity in stats.top_activities
+    )
+    yield _drain(buffer)
 
-    writer.writerow([])
-    writer.writerow(["Categorías"])
-    writer.writerow(["Categoría", "Conteo", "% sobre total"])
-    for item in stats.category_breakdown:
-        writer.writerow([item.category, item.count, f"{item.percentage:.2f}"])
+    writer.writerows([[], ["Categorías"], ["Categoría", "Conteo", "% sobre total"]])
+    writer.writerows(
+        (item.category, item.count, f"{item.percentage:.2f}") for item in stats.category_breakdown
+    )
+    yield _drain(buffer)
 
-    return buffer.getvalue()
+
+def stats_to_csv(stats: AdminStatsOut) -> str:
+    return "".join(iter_stats_csv(stats))
 
 
 def stats_to_pdf(stats: AdminStatsOut) -> bytes:
@@ -320,34 +490,39 @@ def stats_to_pdf(stats: AdminStatsOut) -> bytes:
         f"DAU (último día): {summary.dau_current}",
         f"MAU (mes actual): {summary.mau_current}",
     ]
-    for line in summary_lines:
-        pdf.cell(0, 6, _latin(line), ln=1)
+    pdf.multi_cell(0, 6, _latin("\n".join(summary_lines)))
 
     if stats.top_activities:
         pdf.ln(4)
         pdf.set_font("Helvetica", "B", 13)
         pdf.cell(0, 8, _latin("Top actividades"), ln=1)
         pdf.set_font("Helvetica", "", 11)
-        for activity in stats.top_activities:
-            text = f"{activity.title} ({activity.category or 'Sin categoría'}) – {activity.count} ({activity.percentage:.1f}%)"
-            pdf.multi_cell(0, 6, _latin(text))
+        text = "\n".join(
+            f"{activity.title} ({activity.category or 'Sin categoría'}) – {activity.count} ({activity.percentage:.1f}%)"
+            for activity in stats.top_activities
+        )
+        pdf.multi_cell(0, 6, _latin(text))
 
     if stats.category_breakdown:
         pdf.ln(4)
         pdf.set_font("Helvetica", "B", 13)
         pdf.cell(0, 8, _latin("Categorías"), ln=1)
         pdf.set_font("Helvetica", "", 11)
-        for item in stats.category_breakdown:
-            text = f"{item.category}: {item.count} ({item.percentage:.1f}%)"
-            pdf.cell(0, 6, _latin(text), ln=1)
+        text = "\n".join(
+            f"{item.category}: {item.count} ({item.percentage:.1f}%)" for item in stats.category_breakdown
+        )
+        pdf.multi_cell(0, 6, _latin(text))
 
     pdf.ln(4)
     pdf.set_font("Helvetica", "B", 13)
     pdf.cell(0, 8, _latin("Actividad diaria"), ln=1)
     pdf.set_font("Helvetica", "", 10)
-    for point in stats.daily_active:
-        text = f"{point.date.isoformat()}: {point.active_users} usuarios activos / {point.activities} actividades"
-        pdf.cell(0, 5, _latin(text), ln=1)
+    # Un solo bloque multi_cell en vez de una celda por día (hasta 365 filas).
+    text = "\n".join(
+        f"{point.date.isoformat()}: {point.active_users} usuarios activos / {point.activities} actividades"
+        for point in stats.daily_active
+    )
+    pdf.multi_cell(0, 5, _latin(text))
 
     output = pdf.output(dest="S").encode("latin-1", "replace")
     return output
@@ -355,6 +530,7 @@ def stats_to_pdf(stats: AdminStatsOut) -> bytes:
 
 __all__ = [
     "compute_admin_stats",
+    "iter_stats_csv",
     "stats_to_csv",
     "stats_to_pdf",
     "EXPORT_FORMATS",
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import lru_cache
 from typing import Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 from firebase_admin import firestore
 
 from app.firebase import db
@@ -12,16 +14,30 @@ from app.services.interests_catalog import ensure_catalog_firestore
 
 
 InterestRow = Dict[str, Optional[str | int]]
-CatalogEmbedding = Tuple[InterestRow, List[float]]
+CatalogEmbeddings = Tuple[Tuple[InterestRow, ...], np.ndarray]
 
+_EMBED_CHUNK_SIZE = 64
+_EMBED_MAX_WORKERS = 4
 
-def _field_prefix() -> str:
-    model = get_model_id().lower()
+
+@lru_cache(maxsize=4)
+def _field_prefix_for(model_id: str) -> str:
+    model = model_id.lower()
     sanitized = "".join(ch if ch.isalnum() else "_" for ch in model)
     sanitized = sanitized.strip("_") or "model"
     return f"embedding_{sanitized}"
 
 
+def _field_prefix() -> str:
+    return _field_prefix_for(get_model_id())
+
+
+@lru_cache(maxsize=4)
+def _signature_key(model_id: str) -> bytes:
+    # BLAKE2b keys are limited to 64 bytes.
+    return model_id.encode("utf-8")[:64]
+
+
 def _vector_field() -> str:
     return f"{_field_prefix()}_vector"
 
@@ -46,8 +62,12 @@ def _passage_payload(name: str, category: Optional[str]) -> str:
 
 
 def _signature(payload: str) -> str:
-    raw = f"{get_model_id()}||{payload}".encode("utf-8")
-    return hashlib.sha1(raw).hexdigest()
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16, key=_signature_key(get_model_id())).hexdigest()
+
+
+def _legacy_signature(payload: str) -> str:
+    # SHA-1 scheme used before BLAKE2b; only needed to migrate stored signatures.
+    return hashlib.sha1(f"{get_model_id()}||{payload}".encode("utf-8")).hexdigest()
 
 
 def ensure_catalog_embeddings(force: bool = False) -> None:
@@ -55,20 +75,21 @@ def ensure_catalog_embeddings(force: bool = False) -> None:
 
     ensure_catalog_firestore()
 
-    snapshots = list(db.collection("interests_catalog").stream())
-    if not snapshots:
-        return
-
     vector_field = _vector_field()
     signature_field = _signature_field()
     text_field = _text_field()
     updated_field = _updated_field()
 
+    # Only the fields needed for the signature check are fetched; the stored
+    # vectors stay on the server unless an entry has to be re-embedded.
+    query = db.collection("interests_catalog").select(["name", "category", signature_field])
+
     pending_refs: List = []
     payloads: List[str] = []
     signatures: List[str] = []
+    resigned: List[Tuple] = []
 
-    for snapshot in snapshots:
+    for snapshot in query.stream():
         data = snapshot.to_dict() or {}
         name = (data.get("name") or "").strip()
         category = (data.get("category") or None)
@@ -78,41 +99,64 @@ def ensure_catalog_embeddings(force: bool = False) -> None:
         payload = _passage_payload(name, category)
         sig = _signature(payload)
 
-        has_vector = isinstance(data.get(vector_field), list) and data.get(vector_field)
-        matches_signature = data.get(signature_field) == sig
-
-        if force or not has_vector or not matches_signature:
-            pending_refs.append(snapshot.reference)
-            payloads.append(payload)
-            signatures.append(sig)
+        # The signature is written in the same update as the vector, so a
+        # matching signature implies the vector is present.
+        stored_signature = data.get(signature_field)
+        if not force:
+            if stored_signature == sig:
+                continue
+            if stored_signature == _legacy_signature(payload):
+                # Same payload under the old SHA-1 scheme: the vector is
+                # still valid, only the signature needs rewriting.
+                resigned.append((snapshot.reference, sig))
+                continue
+
+        pending_refs.append(snapshot.reference)
+        payloads.append(payload)
+        signatures.append(sig)
+
+    for start in range(0, len(resigned), 300):
+        batch = db.batch()
+        for ref, sig in resigned[start:start + 300]:
+            batch.set(ref, {signature_field: sig}, merge=True)
+        batch.commit()
 
     if not pending_refs:
         return
 
-    vectors = embed_texts(payloads)
-    if len(vectors) != len(pending_refs):
-        raise HuggingFaceRequestError("No se pudieron generar embeddings para el catálogo de intereses")
-
-    chunk_size = 300  # Firestore batch limit safeguard
-    for start in range(0, len(pending_refs), chunk_size):
-        batch = db.batch()
-        for ref, vec, sig, payload in zip(
-            pending_refs[start:start + chunk_size],
-            vectors[start:start + chunk_size],
-            signatures[start:start + chunk_size],
-            payloads[start:start + chunk_size],
-        ):
-            batch.set(
-                ref,
-                {
-                    vector_field: [float(v) for v in vec],
-                    signature_field: sig,
-                    text_field: payload,
-                    updated_field: firestore.SERVER_TIMESTAMP,
-                },
-                merge=True,
-            )
-        batch.commit()
+    # Each chunk is embedded in parallel and written as soon as it is ready,
+    # so a failing chunk does not discard the ones already stored.
+    starts = range(0, len(pending_refs), _EMBED_CHUNK_SIZE)
+    with ThreadPoolExecutor(max_workers=min(_EMBED_MAX_WORKERS, len(starts))) as executor:
+        futures = {
+            executor.submit(embed_texts, payloads[start:start + _EMBED_CHUNK_SIZE]): start
+            for start in starts
+        }
+        for future in as_completed(futures):
+            start = futures[future]
+            end = start + _EMBED_CHUNK_SIZE
+            vectors = future.result()
+            if len(vectors) != len(pending_refs[start:end]):
+                raise HuggingFaceRequestError("No se pudieron generar embeddings para el catálogo de intereses")
+
+            batch = db.batch()
+            for ref, vec, sig, payload in zip(
+                pending_refs[start:end],
+                vectors,
+                signatures[start:end],
+                payloads[start:end],
+            ):
+                batch.set(
+                    ref,
+                    {
+                        vector_field: np.asarray(vec, dtype=np.float32).tobytes(),
+                        signature_field: sig,
+                        text_field: payload,
+                        updated_field: firestore.SERVER_TIMESTAMP,
+                    },
+                    merge=True,
+                )
+            batch.commit()
 
     # Refresh memoized data if it exists
     try:
@@ -121,17 +165,31 @@ def ensure_catalog_embeddings(force: bool = False) -> None:
         pass
 
 
+def _decode_vector(raw: object) -> Optional[np.ndarray]:
+    if isinstance(raw, bytes):
+        vector = np.frombuffer(raw, dtype=np.float32)
+    elif isinstance(raw, Sequence) and not isinstance(raw, str):
+        # Legacy documents store the vector as a list of floats.
+        vector = np.asarray(raw, dtype=np.float32)
+    else:
+        return None
+    return vector if vector.size else None
+
+
 @lru_cache(maxsize=1)
-def load_interest_embeddings() -> List[CatalogEmbedding]:
-    """Return catalog entries with their precomputed embedding vectors."""
+def load_interest_embeddings() -> CatalogEmbeddings:
+    """
+    Return catalog rows and an L2-normalized float32 matrix with one embedding
+    per row, so cosine similarity against a query is a single matrix product.
+    The result is memoized for the process and must not be mutated.
+    """
 
     ensure_catalog_embeddings()
 
-    snapshots = list(db.collection("interests_catalog").stream())
     vector_field = _vector_field()
 
-    embeddings: List[CatalogEmbedding] = []
-    for snapshot in snapshots:
+    embeddings: List[Tuple[InterestRow, np.ndarray]] = []
+    for snapshot in db.collection("interests_catalog").stream():
         data = snapshot.to_dict() or {}
         name = (data.get("name") or "").strip()
         if not name:
@@ -142,11 +200,10 @@ def load_interest_embeddings() -> List[CatalogEmbedding]:
         except Exception:
             iid = 0
 
-        vector_raw = data.get(vector_field)
-        if not isinstance(vector_raw, Sequence) or not vector_raw:
+        vector = _decode_vector(data.get(vector_field))
+        if vector is None:
             continue
 
-        vector = [float(v) for v in vector_raw]
         row: InterestRow = {
             "id": iid,
             "name": name,
@@ -161,11 +218,17 @@ def load_interest_embeddings() -> List[CatalogEmbedding]:
             "No hay embeddings almacenados para el catálogo de intereses. Ejecuta ensure_catalog_embeddings()"
         )
 
-    return embeddings
+    rows = tuple(row for row, _ in embeddings)
+    matrix = np.vstack([vector for _, vector in embeddings])
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    matrix /= norms
+    matrix.flags.writeable = False
+    return rows, matrix
 
 
 __all__ = [
-    "CatalogEmbedding",
+    "CatalogEmbeddings",
     "InterestRow",
     "ensure_catalog_embeddings",
     "load_interest_embeddings",
@@ -1,15 +1,22 @@
 from __future__ import annotations
 
-from collections import Counter
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 import math
+import re
 import unicodedata
-from typing import Dict, Iterable, Optional, Set, Tuple
+from typing import DefaultDict, Dict, Iterable, Optional, Set, Tuple
 
 from app.domain_activities import ATEMPORAL_ACTIVITIES, get_category_for_activity
 from app.firebase import db
 from app.services.activity_reports import list_reports
 
+# Pool compartido para las tres lecturas de Firestore de cada perfil: evita
+# crear y destruir hilos en cada recomendación.
+_READS_MAX_WORKERS = 12
+_reads_executor = ThreadPoolExecutor(max_workers=_READS_MAX_WORKERS, thread_name_prefix="category-prefs")
 
 @dataclass(frozen=True)
 class CategoryPreferenceProfile:
@@ -25,12 +32,15 @@ class CategoryPreferenceProfile:
 
 
 def get_user_category_preferences(uid: str, *, history_limit: int = 120) -> CategoryPreferenceProfile:
-    favorite_counts, favorite_labels = _favorite_category_counts(uid)
-    history_counts, history_labels = _history_category_counts(uid, limit=history_limit)
-    rating_weights, rating_labels = _history_feedback_weights(uid, limit=history_limit)
-    penalty_counts, penalty_labels, reported_ids = _reported_category_counts(uid)
-
-    weights: Dict[str, float] = {}
+    # The three sources are independent Firestore reads; run them concurrently.
+    favorites_future = _reads_executor.submit(_favorite_category_counts, uid)
+    history_future = _reads_executor.submit(_history_category_stats, uid, limit=history_limit)
+    reports_future = _reads_executor.submit(_reported_category_counts, uid)
+    favorite_counts, favorite_labels = favorites_future.result()
+    history_counts, history_labels, rating_weights, rating_labels = history_future.result()
+    penalty_counts, penalty_labels, reported_ids = reports_future.result()
+
+    weights: DefaultDict[str, float] = defaultdict(float)
     labels: Dict[str, str] = {}
 
     _apply_weights(
@@ -76,7 +86,7 @@ def get_user_category_preferences(uid: str, *, history_limit: int = 120) -> Cate
 
 
 def _apply_weights(
-    weights: Dict[str, float],
+    weights: DefaultDict[str, float],
     labels: Dict[str, str],
     counts: Counter,
     name_map: Dict[str, str],
@@ -88,9 +98,9 @@ def _apply_weights(
         value = transform(count)
         if value == 0:
             continue
-        weights[token] = weights.get(token, 0.0) + value
-        if token not in labels and token in name_map:
-            labels[token] = name_map[token]
+        weights[token] += value
+        if token in name_map:
+            labels.setdefault(token, name_map[token])
 
 
 def _favorite_weight(count: int) -> float:
@@ -124,23 +134,39 @@ def _favorite_category_counts(uid: str) -> Tuple[Counter, Dict[str, str]]:
     return counts, labels
 
 
-def _history_category_counts(uid: str, *, limit: int) -> Tuple[Counter, Dict[str, str]]:
+def _history_category_stats(
+    uid: str, *, limit: int
+) -> Tuple[Counter, Dict[str, str], Dict[str, float], Dict[str, str]]:
     collection = db.collection("users").document(uid).collection("activityHistory")
     query = collection.where("type", "==", "atemporal").limit(limit)
     counts: Counter = Counter()
-    labels: Dict[str, str] = {}
+    count_labels: Dict[str, str] = {}
+    rating_weights: DefaultDict[str, float] = defaultdict(float)
+    rating_labels: Dict[str, str] = {}
     snapshots = query.stream()
 
     for snap in snapshots:
         data = snap.to_dict() or {}
         category = _resolve_category(data, fallback_id=snap.id)
         token = _normalize_category_token(category)
-        if token:
-            counts[token] += 1
-            if token not in labels and category:
-                labels[token] = category
+        if not token:
+            continue
 
-    return counts, labels
+        counts[token] += 1
+        if token not in count_labels and category:
+            count_labels[token] = category
+
+        rating = _resolve_rating(data)
+        if rating is None:
+            continue
+        adjustment = _rating_weight_adjustment(rating)
+        if adjustment == 0:
+            continue
+        rating_weights[token] += adjustment
+        if token not in rating_labels and category:
+            rating_labels[token] = category
+
+    return counts, count_labels, rating_weights, rating_labels
 
 
 def _reported_category_counts(uid: str) -> Tuple[Counter, Dict[str, str], Set[int]]:
@@ -164,49 +190,34 @@ def _reported_category_counts(uid: str) -> Tuple[Counter, Dict[str, str], Set[in
     return counts, labels, reported_ids
 
 
-def _history_feedback_weights(uid: str, *, limit: int) -> Tuple[Dict[str, float], Dict[str, str]]:
-    collection = db.collection("users").document(uid).collection("activityHistory")
-    query = collection.where("type", "==", "atemporal").limit(limit)
-    weights: Dict[str, float] = {}
-    labels: Dict[str, str] = {}
-    snapshots = query.stream()
-
-    for snap in snapshots:
-        data = snap.to_dict() or {}
-        rating = _resolve_rating(data)
-        if rating is None:
-            continue
-        category = _resolve_category(data, fallback_id=snap.id)
-        token = _normalize_category_token(category)
-        if not token:
-            continue
-        adjustment = _rating_weight_adjustment(rating)
-        if adjustment == 0:
-            continue
-        weights[token] = weights.get(token, 0.0) + adjustment
-        if token not in labels and category:
-            labels[token] = category
-
-    return weights, labels
+_DIACRITIC_TABLE = str.maketrans(
+    "áéíóúüñàèìòùÁÉÍÓÚÜÑÀÈÌÒÙ",
+    "aeiouunaeiouAEIOUUNAEIOU",
+)
 
 
+@lru_cache(maxsize=1024)
 def _normalize_category_token(value: Optional[str]) -> Optional[str]:
     if not value:
         return None
-    normalized = unicodedata.normalize("NFKD", value)
-    cleaned = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+    cleaned = value.translate(_DIACRITIC_TABLE)
+    if not cleaned.isascii():
+        normalized = unicodedata.normalize("NFKD", cleaned)
+        cleaned = "".join(ch for ch in normalized if not unicodedata.combining(ch))
     token = cleaned.lower().strip()
     return token or None
 
 
-_ATEMPORAL_BY_ID: Dict[int, Dict] = {}
-for item in ATEMPORAL_ACTIVITIES:
-    try:
-        raw_id = item.get("id")
-        numeric_id = int(raw_id)
-    except (AttributeError, TypeError, ValueError):
-        continue
-    _ATEMPORAL_BY_ID[numeric_id] = item
+_ATEMPORAL_ID_TO_CATEGORY: Dict[int, str] = {
+    int(item["id"]): category
+    for item in ATEMPORAL_ACTIVITIES
+    if str(item.get("id", "")).lstrip("-").isdigit()
+    and (category := get_category_for_activity(item))
+}
+
+
+# Accepts "12", "atemporal-12", "atemporal::12", "ATEMPORAL_12", etc.
+_ATEMPORAL_ID_RE = re.compile(r"^(?:atemporal[:_\- ]*){0,2}[:_\- ]*(\d+)[:_\- ]*$", re.IGNORECASE)
 
 
 def _atemporal_numeric_id(raw: object) -> Optional[int]:
@@ -220,19 +231,9 @@ def _atemporal_numeric_id(raw: object) -> Optional[int]:
         if raw.is_integer():
             return int(raw)
         return None
-    text = str(raw).strip().lower()
-    if not text:
-        return None
-    prefixes = ("atemporal-", "atemporal_", "atemporal::", "atemporal ")
-    for prefix in prefixes:
-        if text.startswith(prefix):
-            text = text[len(prefix):]
-            break
-    if text.startswith("atemporal"):
-        text = text.replace("atemporal", "", 1)
-    text = text.strip(":_- ")
-    if text.isdigit():
-        return int(text)
+    match = _ATEMPORAL_ID_RE.match(str(raw).strip())
+    if match:
+        return int(match.group(1))
     return None
 
 
@@ -248,11 +249,9 @@ def _resolve_category(data: Dict, *, fallback_id: Optional[str] = None) -> Optio
     )
     numeric_id = _atemporal_numeric_id(activity_id)
     if numeric_id is not None:
-        catalog_entry = _ATEMPORAL_BY_ID.get(numeric_id)
-        if catalog_entry:
-            category = get_category_for_activity(catalog_entry)
-            if category:
-                return category
+        category = _ATEMPORAL_ID_TO_CATEGORY.get(numeric_id)
+        if category:
+            return category
 
     tags = data.get("tags")
     if isinstance(tags, Iterable) and not isinstance(tags, (str, bytes)):
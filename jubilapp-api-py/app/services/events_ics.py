@@ -1,10 +1,14 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
-from math import asin, cos, radians, sin, sqrt
-from typing import Dict, List, Optional
+import asyncio
+import heapq
+import re
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import httpx
+import numpy as np
 from dateutil import tz
 from ics import Calendar
 
@@ -22,26 +26,52 @@ FREE_PATTERNS = [
     "$0",
     "0 clp",
 ]
+_FREE_RE = re.compile("|".join(map(re.escape, FREE_PATTERNS)), re.IGNORECASE)
+_DTSTART_DATE_RE = re.compile(r"^DTSTART[^:\r\n]*:(\d{4})(\d{2})(\d{2})", re.MULTILINE)
 
-_CACHE: Dict[str, Dict[str, object]] = {}
+# Cache por URL de feed (LRU acotado): url -> (guardado_en, eventos).
+_CACHE: "OrderedDict[str, Tuple[datetime, Tuple[EventItem, ...]]]" = OrderedDict()
 _CACHE_TTL_SECONDS = 900
+_CACHE_MAX_ENTRIES = 64
+
+# Cliente HTTP compartido: reutiliza conexiones (keep-alive/HTTP2) entre requests.
+_CLIENT: Optional[httpx.AsyncClient] = None
 
 
 class ICSProviderError(RuntimeError):
     """Raised when the ICS feeds cannot be fetched or parsed."""
 
 
-def _haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+def _get_client() -> httpx.AsyncClient:
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = httpx.AsyncClient(
+            timeout=20.0,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+            http2=True,
+        )
+    return _CLIENT
+
+
+async def aclose_client() -> None:
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
+
+def _haversine_km_many(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Distancia en km desde (lat, lng) a cada punto; NaN se propaga."""
     radius = 6371.0
-    dlat = radians(lat2 - lat1)
-    dlng = radians(lng2 - lng1)
-    value = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlng / 2) ** 2
-    return 2 * radius * asin(sqrt(value))
+    dlat = np.radians(lats - lat)
+    dlng = np.radians(lngs - lng)
+    value = np.sin(dlat / 2) ** 2 + np.cos(np.radians(lat)) * np.cos(np.radians(lats)) * np.sin(dlng / 2) ** 2
+    return 2 * radius * np.arcsin(np.sqrt(value))
 
 
 def _looks_free(*chunks: Optional[str]) -> bool:
-    blob = " ".join([chunk or "" for chunk in chunks]).lower()
-    return any(pattern in blob for pattern in FREE_PATTERNS)
+    blob = " ".join(chunk for chunk in chunks if chunk)
+    return _FREE_RE.search(blob) is not None
 
 
 def _ensure_utc(dt: Optional[datetime]) -> Optional[datetime]:
@@ -54,33 +84,40 @@ def _ensure_utc(dt: Optional[datetime]) -> Optional[datetime]:
 
 def _cache_get(feed_url: str) -> Optional[List[EventItem]]:
     cached = _CACHE.get(feed_url)
-    if not cached:
-        return None
-    stored_at = cached.get("at")
-    if not isinstance(stored_at, datetime):
+    if cached is None:
         return None
+    stored_at, events = cached
     if (datetime.now(timezone.utc) - stored_at).total_seconds() > _CACHE_TTL_SECONDS:
+        del _CACHE[feed_url]
         return None
-    events = cached.get("events")
-    return events if isinstance(events, list) else None
+    _CACHE.move_to_end(feed_url)
+    return list(events)
 
 
 def _cache_set(feed_url: str, events: List[EventItem]) -> None:
-    _CACHE[feed_url] = {"at": datetime.now(timezone.utc), "events": events}
+    _CACHE[feed_url] = (datetime.now(timezone.utc), tuple(events))
+    _CACHE.move_to_end(feed_url)
+    while len(_CACHE) > _CACHE_MAX_ENTRIES:
+        _CACHE.popitem(last=False)
 
 
 def _make_id(feed_name: str, start_iso: str, title: str) -> str:
+    # Formato estable: favoritos e historial guardan estos ids, no se debe re-keyear.
     normalized_title = title[:40].replace(":", " ").strip() or "evento"
     return f"ics:{feed_name}:{start_iso}:{normalized_title}"
 
 
 def _parse_event_start(event: EventItem) -> Optional[datetime]:
+    if event._start_dt is not None:
+        return event._start_dt
     if not event.start_utc:
         return None
     try:
-        return datetime.fromisoformat(event.start_utc.replace("Z", "+00:00"))
+        start = datetime.fromisoformat(event.start_utc.replace("Z", "+00:00"))
     except ValueError:
         return None
+    event._start_dt = start
+    return start
 
 
 def _to_float(value: Optional[object]) -> Optional[float]:
@@ -90,23 +127,37 @@ def _to_float(value: Optional[object]) -> Optional[float]:
         return None
 
 
-async def _parse_event(
+def _parse_event(
     feed: Dict[str, object],
     raw_event,
-) -> Optional[EventItem]:
-    start = _ensure_utc(getattr(getattr(raw_event, "begin", None), "datetime", None))
-    if not start:
+) -> Optional[Tuple[EventItem, List[str]]]:
+    """
+    Construye el EventItem sin red. Devuelve además las consultas de geocoding
+    a intentar (en orden) cuando el evento no trae GEO; el venue queda con las
+    coordenadas del feed hasta que `_apply_geocoding` las resuelva.
+    """
+    # ics.Event define todos estos atributos; se leen una sola vez.
+    try:
+        begin = raw_event.begin
+        end_raw = raw_event.end
+        name = raw_event.name
+        description_raw = raw_event.description
+        location_text_raw = raw_event.location
+        geo = raw_event.geo
+        event_url = raw_event.url
+        extra = raw_event.extra
+    except AttributeError:
         return None
 
-    end = _ensure_utc(getattr(getattr(raw_event, "end", None), "datetime", None))
+    start = _ensure_utc(begin.datetime) if begin is not None else None
+    if not start:
+        return None
 
-    name = getattr(raw_event, "name", None) or "Evento"
-    title = name.strip() if isinstance(name, str) else "Evento"
+    end = _ensure_utc(end_raw.datetime) if end_raw is not None else None
 
-    description_raw = getattr(raw_event, "description", None)
-    description = description_raw.strip() if isinstance(description_raw, str) else ""
-    location_text_raw = getattr(raw_event, "location", None)
-    location_text = location_text_raw.strip() if isinstance(location_text_raw, str) else ""
+    title = name.strip() if name else "Evento"
+    description = description_raw.strip() if description_raw else ""
+    location_text = location_text_raw.strip() if location_text_raw else ""
 
     fallback_lat = _to_float(feed.get("lat"))
     fallback_lng = _to_float(feed.get("lng"))
@@ -116,29 +167,18 @@ async def _parse_event(
     feed_city_raw = feed.get("city")
     feed_city = feed_city_raw.strip() if isinstance(feed_city_raw, str) and feed_city_raw.strip() else None
 
-    geo = getattr(raw_event, "geo", None)
-    geo_lat = _to_float(getattr(geo, "latitude", None))
-    geo_lng = _to_float(getattr(geo, "longitude", None))
+    queries: List[str] = []
+    geo_lat = _to_float(geo.latitude) if geo is not None else None
+    geo_lng = _to_float(geo.longitude) if geo is not None else None
     if geo_lat is not None and geo_lng is not None:
         vlat, vlng = geo_lat, geo_lng
     elif location_text:
-        queries = [location_text]
+        queries.append(location_text)
         if feed_city and feed_city.lower() not in location_text.lower():
             queries.append(f"{location_text}, {feed_city}")
 
-        for query_text in queries:
-            coords = await geocode_text(query_text)
-            if coords:
-                vlat, vlng = coords
-                break
-
-    if vlat is None or vlng is None:
-        vlat = fallback_lat
-        vlng = fallback_lng
-
-    event_url = getattr(raw_event, "url", None)
-    if event_url is None and hasattr(raw_event, "extra"):
-        event_url = raw_event.extra.get("URL") if isinstance(raw_event.extra, dict) else None
+    if event_url is None and isinstance(extra, dict):
+        event_url = extra.get("URL")
 
     url = str(event_url).strip() if event_url else ""
 
@@ -161,7 +201,86 @@ async def _parse_event(
         ),
         source="ics",
     )
-    return item
+    item._start_dt = start
+    return item, queries
+
+
+async def _apply_geocoding(parsed: List[Tuple[EventItem, List[str]]]) -> None:
+    """
+    Geocodifica por rondas: primero la consulta principal de cada evento y
+    luego la alternativa solo para los que fallaron. Cada ronda consulta una
+    vez cada dirección distinta, así el rate limit de Nominatim se paga por
+    venue y no por evento.
+    """
+    pending = [(item, queries) for item, queries in parsed if queries]
+    round_index = 0
+    while pending:
+        unique_queries = list(dict.fromkeys(queries[round_index] for _, queries in pending))
+        results = await asyncio.gather(*(geocode_text(query) for query in unique_queries))
+        coords_by_query = dict(zip(unique_queries, results))
+
+        round_index += 1
+        unresolved = []
+        for item, queries in pending:
+            coords = coords_by_query.get(queries[round_index - 1])
+            if coords and item.venue is not None:
+                item.venue.lat, item.venue.lng = coords
+            elif len(queries) > round_index:
+                unresolved.append((item, queries))
+        pending = unresolved
+
+
+def _iter_vevent_spans(text: str) -> Iterator[Tuple[int, int]]:
+    position = 0
+    while True:
+        start = text.find("BEGIN:VEVENT", position)
+        if start == -1:
+            return
+        end = text.find("END:VEVENT", start)
+        if end == -1:
+            return
+        end += len("END:VEVENT")
+        yield start, end
+        position = end
+
+
+def _is_past_block(block: str, cutoff: date) -> bool:
+    match = _DTSTART_DATE_RE.search(block)
+    if not match or "RRULE" in block:
+        return False
+    try:
+        start_date = date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    except ValueError:
+        return False
+    return start_date < cutoff
+
+
+def _drop_past_events(text: str, now_utc: datetime) -> str:
+    """
+    Quita los VEVENT que empiezan antes de hoy, mirando solo la fecha de
+    DTSTART, para que `Calendar` no construya eventos que ningún filtro va a
+    aceptar. Se deja un día de margen por zonas horarias y se conservan los
+    bloques recurrentes o con DTSTART ilegible. Solo se recortan los bloques
+    descartados: el resto del texto (VTIMEZONE, propiedades) queda intacto.
+    """
+    cutoff = (now_utc - timedelta(days=1)).date()
+    pieces: List[str] = []
+    position = 0
+    for start, end in _iter_vevent_spans(text):
+        if not _is_past_block(text[start:end], cutoff):
+            continue
+        pieces.append(text[position:start])
+        # El salto de línea del END:VEVENT se va con el bloque
+        if text.startswith("\r\n", end):
+            end += 2
+        elif text.startswith("\n", end):
+            end += 1
+        position = end
+
+    if not pieces:
+        return text
+    pieces.append(text[position:])
+    return "".join(pieces)
 
 
 async def _fetch_feed(client: httpx.AsyncClient, feed: Dict[str, object]) -> List[EventItem]:
@@ -181,21 +300,97 @@ async def _fetch_feed(client: httpx.AsyncClient, feed: Dict[str, object]) -> Lis
     if response.status_code != 200:
         raise ICSProviderError(f"Feed ICS {feed_url} devolvio {response.status_code}")
 
+    # RFC 5545 fija UTF-8: decodificar los bytes directo evita la detección de
+    # charset de httpx sobre payloads de varios MB.
+    raw_text = response.content.decode("utf-8", "replace")
     try:
-        calendar = Calendar(response.text)
+        calendar = Calendar(_drop_past_events(raw_text, datetime.now(timezone.utc)))
     except Exception as exc:  # noqa: BLE001 - libreria externa puede lanzar varios errores
         raise ICSProviderError(f"Feed ICS {feed_url} tiene formato invalido") from exc
 
-    events: List[EventItem] = []
+    parsed: List[Tuple[EventItem, List[str]]] = []
     for raw_event in getattr(calendar, "events", []):
-        item = await _parse_event(feed, raw_event)
-        if item:
-            events.append(item)
+        result = _parse_event(feed, raw_event)
+        if result:
+            parsed.append(result)
+
+    await _apply_geocoding(parsed)
+    events = [item for item, _ in parsed]
+    # Cada feed queda ordenado por inicio para poder mezclarlos sin re-ordenar.
+    events.sort(key=_parse_event_start)
 
     _cache_set(feed_url, events)
     return events
 
 
+async def _fetch_all_feeds() -> List[Tuple[Dict[str, object], List[EventItem]]]:
+    """Descarga todos los feeds en paralelo; omite los que fallan con ICSProviderError."""
+    client = _get_client()
+    results = await asyncio.gather(
+        *(_fetch_feed(client, feed) for feed in FEEDS),
+        return_exceptions=True,
+    )
+    fetched: List[Tuple[Dict[str, object], List[EventItem]]] = []
+    for feed, result in zip(FEEDS, results):
+        if isinstance(result, ICSProviderError):
+            continue
+        if isinstance(result, BaseException):
+            raise result
+        fetched.append((feed, result))
+    return fetched
+
+
+def _filter_events(
+    feed: Dict[str, object],
+    feed_events: List[EventItem],
+    *,
+    now_utc: datetime,
+    limit_utc: datetime,
+    query: Optional[str],
+    free_only: bool,
+    origin: Optional[Tuple[float, float]] = None,
+    radius_km: Optional[float] = None,
+) -> List[EventItem]:
+    query_lower = query.lower() if query else None
+    items: List[EventItem] = []
+    for event in feed_events:
+        start = _parse_event_start(event)
+        # Si el formato es raro, omitimos el evento
+        if not start or start < now_utc or start > limit_utc:
+            continue
+
+        if query_lower:
+            haystack = f"{event.title} {event.venue.address if event.venue else ''}".lower()
+            if query_lower not in haystack:
+                continue
+
+        if free_only and not event.is_free:
+            continue
+
+        items.append(event)
+
+    if origin is None or radius_km is None or not items:
+        return items
+
+    # Filtro de radio vectorizado: eventos sin coordenadas (NaN) se conservan.
+    fallback = (_to_float(feed.get("lat")), _to_float(feed.get("lng")))
+    coords = np.array([_event_coords(event, fallback) for event in items], dtype=np.float64)
+    distances = _haversine_km_many(origin[0], origin[1], coords[:, 0], coords[:, 1])
+    keep = np.isnan(distances) | (distances <= radius_km)
+    return [items[index] for index in keep.nonzero()[0]]
+
+
+def _event_coords(event: EventItem, fallback: Tuple[Optional[float], Optional[float]]) -> Tuple[float, float]:
+    venue = event.venue
+    vlat = venue.lat if venue else None
+    vlng = venue.lng if venue else None
+    if vlat is None or vlng is None:
+        vlat, vlng = fallback
+    if vlat is None or vlng is None:
+        return (np.nan, np.nan)
+    return (vlat, vlng)
+
+
 async def fetch_ics_nearby(
     *,
     lat: float,
@@ -211,52 +406,20 @@ async def fetch_ics_nearby(
     now_utc = datetime.now(timezone.utc)
     limit_utc = now_utc + timedelta(days=days_ahead)
 
-    items: List[EventItem] = []
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        for feed in FEEDS:
-            try:
-                feed_events = await _fetch_feed(client, feed)
-            except ICSProviderError:
-                continue
-
-            for event in feed_events:
-                try:
-                    start = datetime.fromisoformat(event.start_utc.replace("Z", "+00:00"))
-                except ValueError:
-                    # Si el formato es raro, omitimos el evento
-                    continue
-
-                if start < now_utc or start > limit_utc:
-                    continue
-
-                venue = event.venue
-                vlat = venue.lat if venue else None
-                vlng = venue.lng if venue else None
-                if vlat is None or vlng is None:
-                    vlat = feed.get("lat")
-                    vlng = feed.get("lng")
-                try:
-                    vlat_f = float(vlat) if vlat is not None else None
-                    vlng_f = float(vlng) if vlng is not None else None
-                except (TypeError, ValueError):
-                    vlat_f = None
-                    vlng_f = None
-
-                if vlat_f is not None and vlng_f is not None:
-                    if _haversine_km(lat, lng, vlat_f, vlng_f) > radius_km:
-                        continue
-
-                if query:
-                    haystack = f"{event.title} {event.venue.address if event.venue else ''}".lower()
-                    if query.lower() not in haystack:
-                        continue
-
-                if free_only and not event.is_free:
-                    continue
-
-                items.append(event)
-
-    items.sort(key=lambda item: item.start_utc)
+    per_feed = [
+        _filter_events(
+            feed,
+            feed_events,
+            now_utc=now_utc,
+            limit_utc=limit_utc,
+            query=query,
+            free_only=free_only,
+            origin=(lat, lng),
+            radius_km=radius_km,
+        )
+        for feed, feed_events in await _fetch_all_feeds()
+    ]
+    items = list(heapq.merge(*per_feed, key=_parse_event_start))
     return EventsResponse(total=len(items), items=items)
 
 
@@ -274,28 +437,15 @@ async def fetch_ics_all(
     now_utc = datetime.now(timezone.utc)
     limit_utc = now_utc + timedelta(days=days_ahead)
 
-    items: List[EventItem] = []
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        for feed in FEEDS:
-            try:
-                feed_events = await _fetch_feed(client, feed)
-            except ICSProviderError:
-                continue
-
-            for event in feed_events:
-                start = _parse_event_start(event)
-                if not start or start < now_utc or start > limit_utc:
-                    continue
-
-                if query:
-                    haystack = f"{event.title} {event.venue.address if event.venue else ''}".lower()
-                    if query.lower() not in haystack:
-                        continue
-
-                if free_only and not event.is_free:
-                    continue
-
-                items.append(event)
-
-    items.sort(key=lambda item: item.start_utc)
-    return items
+    per_feed = [
+        _filter_events(
+            feed,
+            feed_events,
+            now_utc=now_utc,
+            limit_utc=limit_utc,
+            query=query,
+            free_only=free_only,
+        )
+        for feed, feed_events in await _fetch_all_feeds()
+    ]
+    return list(heapq.merge(*per_feed, key=_parse_event_start))
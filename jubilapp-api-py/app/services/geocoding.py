@@ -3,40 +3,75 @@
 from __future__ import annotations
 
 import asyncio
-import hashlib
 import time
-from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+from typing import Optional, Tuple
 
 import httpx
 
 UA = "jubilapp-geocoder/1.0 (+https://jubilapp.local)"
-_CACHE: Dict[str, Tuple[float, Tuple[float, float]]] = {}
+# LRU acotado: consulta normalizada -> (expira_en, coords).
+_CACHE: "OrderedDict[str, Tuple[float, Tuple[float, float]]]" = OrderedDict()
 _TTL_SECONDS = 60 * 60 * 24 * 30  # 30 días
+_CACHE_MAX_ENTRIES = 4096
 _last_call: float = 0.0
+_rate_limit_lock = asyncio.Lock()
+_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = httpx.AsyncClient(
+            timeout=8.0,
+            headers={"User-Agent": UA, "Accept-Language": "es"},
+            limits=httpx.Limits(max_keepalive_connections=4, max_connections=8),
+            http2=True,
+        )
+    return _CLIENT
+
+
+async def aclose_client() -> None:
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
 
 
 def _ckey(query: str) -> str:
-    return hashlib.sha1(query.strip().lower().encode()).hexdigest()
+    return query.strip().lower()
 
 
 def _get_cache(query: str) -> Optional[Tuple[float, float]]:
-    cached = _CACHE.get(_ckey(query))
-    if cached and cached[0] > time.time():
-        return cached[1]
-    return None
+    key = _ckey(query)
+    cached = _CACHE.get(key)
+    if cached is None:
+        return None
+    if cached[0] <= time.time():
+        del _CACHE[key]
+        return None
+    _CACHE.move_to_end(key)
+    return cached[1]
 
 
 def _set_cache(query: str, coords: Tuple[float, float]) -> None:
-    _CACHE[_ckey(query)] = (time.time() + _TTL_SECONDS, coords)
+    key = _ckey(query)
+    _CACHE[key] = (time.time() + _TTL_SECONDS, coords)
+    _CACHE.move_to_end(key)
+    while len(_CACHE) > _CACHE_MAX_ENTRIES:
+        _CACHE.popitem(last=False)
 
 
 async def _wait_rate_limit(min_delay: float = 1.0) -> None:
+    # El lock serializa a los llamadores concurrentes (p. ej. asyncio.gather)
+    # para respetar el límite de 1 request/segundo de Nominatim.
     global _last_call
-    now = time.time()
-    elapsed = now - _last_call
-    if elapsed < min_delay:
-        await asyncio.sleep(min_delay - elapsed)
-    _last_call = time.time()
+    async with _rate_limit_lock:
+        now = time.time()
+        elapsed = now - _last_call
+        if elapsed < min_delay:
+            await asyncio.sleep(min_delay - elapsed)
+        _last_call = time.time()
 
 
 async def geocode_text(location_text: str) -> Optional[Tuple[float, float]]:
@@ -55,7 +90,6 @@ async def geocode_text(location_text: str) -> Optional[Tuple[float, float]]:
 
     await _wait_rate_limit()
 
-    headers = {"User-Agent": UA, "Accept-Language": "es"}
     params = {
         "q": query,
         "format": "jsonv2",
@@ -66,8 +100,7 @@ async def geocode_text(location_text: str) -> Optional[Tuple[float, float]]:
     }
 
     try:
-        async with httpx.AsyncClient(timeout=8.0, headers=headers) as client:
-            response = await client.get("https://nominatim.openstreetmap.org/search", params=params)
+        response = await _get_client().get("https://nominatim.openstreetmap.org/search", params=params)
     except httpx.HTTPError:
         return None
 
@@ -2,10 +2,13 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
 import time
-from math import sqrt
-from typing import Any, Iterable, List, Sequence
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Sequence, Tuple
 
+import numpy as np
 import requests
 
 try:
@@ -18,7 +21,13 @@ _MODEL_ID = os.getenv("HUGGINGFACE_MODEL_ID", DEFAULT_MODEL_ID)
 _API_URL = os.getenv("HUGGINGFACE_API_URL") or f"https://api-inference.huggingface.co/models/{_MODEL_ID}"
 _API_TOKEN = os.getenv("HUGGINGFACE_API_KEY") or os.getenv("HUGGINGFACE_TOKEN")
 
+# Sesión compartida con pool explícito: mantiene vivas las conexiones TLS al API
+# entre llamadas. Los reintentos los maneja _embed_texts_remote (503 "loading").
 _SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=0),
+)
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -56,6 +65,22 @@ _LOCAL_BATCH_SIZE = max(1, min(_LOCAL_BATCH_SIZE, 128))
 _LOCAL_MODEL: Any | None = None
 _LOCAL_MODEL_ERROR: Exception | None = None
 
+# LRU de embeddings ya calculados: (modelo, normalize, texto) -> vector.
+# Vectores guardados como tuplas inmutables; embed_texts devuelve copias en lista.
+_EMBED_CACHE: "OrderedDict[Tuple[str, bool, str], Tuple[float, ...]]" = OrderedDict()
+_EMBED_CACHE_MAX_ENTRIES = 4096
+_EMBED_CACHE_LOCK = threading.Lock()
+
+# Micro-batching del API remoto: las llamadas concurrentes (endpoints síncronos
+# corren en el threadpool) se agrupan durante una ventana corta en un solo POST.
+_REMOTE_BATCH_WINDOW_SECONDS = 0.01
+_REMOTE_BATCH_MAX_TEXTS = 32
+_REMOTE_BATCH_LOCK = threading.Lock()
+# Despierta a los que esperan cuando se resuelven futures o queda libre el liderazgo.
+_REMOTE_BATCH_COND = threading.Condition(_REMOTE_BATCH_LOCK)
+_REMOTE_BATCH_QUEUES: Dict[bool, Deque[Tuple[List[str], Future]]] = {}
+_REMOTE_BATCH_LEADERS: set = set()
+
 
 def _load_local_model():
     global _LOCAL_MODEL, _LOCAL_MODEL_ERROR
@@ -82,9 +107,34 @@ def _load_local_model():
         _LOCAL_MODEL_ERROR = error
         raise error from exc
 
+    _optimize_local_model(_LOCAL_MODEL, device)
     return _LOCAL_MODEL
 
 
+def _optimize_local_model(model: Any, device: str) -> None:
+    """
+    FP16 en GPU; en CPU, cuantización dinámica int8 de las capas Linear solo con
+    HUGGINGFACE_QUANTIZE=1. Es opt-in porque el id del modelo (y con él la firma de
+    los embeddings del catálogo) no cambia: al activarla hay que re-embeber el
+    catálogo para no comparar vectores int8 contra vectores fp32 guardados.
+    """
+    try:
+        import torch
+    except ImportError:  # pragma: no cover - torch viene con sentence-transformers
+        return
+
+    try:
+        if device.startswith("cuda"):
+            model.half()
+        elif device == "cpu" and _env_flag("HUGGINGFACE_QUANTIZE", default=False):
+            transformer = model[0]
+            transformer.auto_model = torch.quantization.quantize_dynamic(
+                transformer.auto_model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+    except Exception as exc:  # pragma: no cover - depende del backend de torch disponible
+        _LOGGER.warning("No se pudo optimizar el modelo local de embeddings: %s", exc)
+
+
 def _embed_texts_local(texts: Sequence[str], *, normalize: bool) -> List[List[float]]:
     model = _load_local_model()
     try:
@@ -92,38 +142,27 @@ def _embed_texts_local(texts: Sequence[str], *, normalize: bool) -> List[List[fl
             list(texts),
             batch_size=_LOCAL_BATCH_SIZE,
             convert_to_numpy=True,
+            convert_to_tensor=False,
             normalize_embeddings=normalize,
             show_progress_bar=False,
         )
     except Exception as exc:  # pragma: no cover - ejecución dependiente del entorno
         raise HuggingFaceRequestError(f"Error generando embeddings con el modelo local: {exc}") from exc
 
-    if hasattr(vectors, "tolist"):
-        raw_vectors = vectors.tolist()
-    else:
-        raw_vectors = vectors
-    return [[float(value) for value in row] for row in raw_vectors]
+    # ndarray.tolist() ya entrega floats de Python en un solo bucle en C.
+    return np.asarray(vectors, dtype=np.float32).tolist()
 
 
-def _mean_pooling(matrix: Sequence[Sequence[float]]) -> List[float]:
-    length = len(matrix)
-    if not length:
-        return []
-    dims = len(matrix[0]) if matrix[0] else 0
-    if not dims:
-        return []
-    return [
-        float(sum(row[i] for row in matrix) / length)
-        for i in range(dims)
-    ]
+def _mean_pooling(matrix: Sequence[Sequence[float]]) -> np.ndarray:
+    array = np.asarray(matrix, dtype=np.float32)
+    if array.ndim != 2 or not array.size:
+        return np.zeros(0, dtype=np.float32)
+    return array.mean(axis=0)
 
 
-def _normalize(vec: Iterable[float]) -> List[float]:
-    values = [float(v) for v in vec]
-    norm = sqrt(sum(v * v for v in values)) or 0.0
-    if norm == 0.0:
-        return values
-    return [v / norm for v in values]
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0.0, 1.0, norms)
 
 
 def _embed_texts_remote(
@@ -149,7 +188,7 @@ def _embed_texts_remote(
             attempt += 1
             continue
 
-        if response.status_code == 503 and "loading" in (response.text or "").lower():
+        if response.status_code == 503 and b"loading" in response.content.lower():
             time.sleep(min(2 ** attempt, 6))
             attempt += 1
             continue
@@ -191,21 +230,92 @@ def _embed_texts_remote(
         else:
             raise HuggingFaceRequestError("No se pudo alinear las respuestas del modelo")
 
-        vectors: List[List[float]] = []
+        rows: List[np.ndarray] = []
         for seq in sequences:
             if isinstance(seq, list) and seq and all(isinstance(x, (int, float)) for x in seq):
-                vec = [float(x) for x in seq]
-                vectors.append(_normalize(vec) if normalize else vec)
+                rows.append(np.asarray(seq, dtype=np.float32))
                 continue
             if not isinstance(seq, list) or not seq or not isinstance(seq[0], list):
                 raise HuggingFaceRequestError("Respuesta de embeddings inesperada")
-            pooled = _mean_pooling(seq)  # type: ignore[arg-type]
-            vectors.append(_normalize(pooled) if normalize else pooled)
-        return vectors
+            rows.append(_mean_pooling(seq))  # type: ignore[arg-type]
+
+        try:
+            matrix = np.vstack(rows)
+        except ValueError as exc:
+            raise HuggingFaceRequestError("Respuesta de embeddings inesperada") from exc
+        if normalize:
+            matrix = _normalize_rows(matrix)
+        return matrix.tolist()
 
     raise HuggingFaceRequestError(f"No se pudo obtener respuesta del API de HuggingFace: {last_error}")
 
 
+def _flush_remote_batch(
+    batch: List[Tuple[List[str], Future]],
+    *,
+    normalize: bool,
+    retries: int,
+    timeout: float,
+) -> None:
+    flat = [text for texts, _ in batch for text in texts]
+    try:
+        vectors = _embed_texts_remote(flat, normalize=normalize, retries=retries, timeout=timeout)
+    except Exception as exc:
+        for _, future in batch:
+            future.set_exception(exc)
+        return
+
+    offset = 0
+    for texts, future in batch:
+        future.set_result(vectors[offset:offset + len(texts)])
+        offset += len(texts)
+
+
+def _embed_texts_remote_batched(
+    texts: List[str],
+    *,
+    normalize: bool,
+    retries: int,
+    timeout: float,
+) -> List[List[float]]:
+    """
+    Encola los textos y espera su resultado. Un llamador a la vez actúa como
+    líder: duerme unos milisegundos, agrupa lo acumulado (hasta
+    _REMOTE_BATCH_MAX_TEXTS por POST) y reparte los vectores por posición. El
+    líder solo vacía la cola hasta resolver su propio future (FIFO, así que es
+    acotado) y luego cede el liderazgo al siguiente llamador en espera.
+    """
+    future: Future = Future()
+    with _REMOTE_BATCH_COND:
+        _REMOTE_BATCH_QUEUES.setdefault(normalize, deque()).append((texts, future))
+        while not future.done() and normalize in _REMOTE_BATCH_LEADERS:
+            _REMOTE_BATCH_COND.wait()
+        if future.done():
+            return future.result()
+        _REMOTE_BATCH_LEADERS.add(normalize)
+
+    try:
+        time.sleep(_REMOTE_BATCH_WINDOW_SECONDS)
+        while not future.done():
+            with _REMOTE_BATCH_COND:
+                queue = _REMOTE_BATCH_QUEUES[normalize]
+                batch: List[Tuple[List[str], Future]] = []
+                size = 0
+                while queue and (not batch or size + len(queue[0][0]) <= _REMOTE_BATCH_MAX_TEXTS):
+                    item = queue.popleft()
+                    batch.append(item)
+                    size += len(item[0])
+            _flush_remote_batch(batch, normalize=normalize, retries=retries, timeout=timeout)
+            with _REMOTE_BATCH_COND:
+                _REMOTE_BATCH_COND.notify_all()
+    finally:
+        with _REMOTE_BATCH_COND:
+            _REMOTE_BATCH_LEADERS.discard(normalize)
+            _REMOTE_BATCH_COND.notify_all()
+
+    return future.result()
+
+
 def get_model_id() -> str:
     """Expose the model id resolved from configuration."""
     return _MODEL_ID
@@ -216,12 +326,47 @@ def embed_texts(texts: Sequence[str], *, normalize: bool = True, retries: int =
     if not cleaned:
         return []
 
+    keys = [(_MODEL_ID, normalize, text) for text in cleaned]
+    found: Dict[Tuple[str, bool, str], Tuple[float, ...]] = {}
+    with _EMBED_CACHE_LOCK:
+        for key in dict.fromkeys(keys):
+            vector = _EMBED_CACHE.get(key)
+            if vector is not None:
+                _EMBED_CACHE.move_to_end(key)
+                found[key] = vector
+
+    missing = [key for key in dict.fromkeys(keys) if key not in found]
+    if missing:
+        vectors = _embed_uncached(
+            [key[2] for key in missing], normalize=normalize, retries=retries, timeout=timeout
+        )
+        with _EMBED_CACHE_LOCK:
+            for key, vector in zip(missing, vectors):
+                frozen = tuple(vector)
+                found[key] = frozen
+                _EMBED_CACHE[key] = frozen
+            while len(_EMBED_CACHE) > _EMBED_CACHE_MAX_ENTRIES:
+                _EMBED_CACHE.popitem(last=False)
+
+    return [list(found[key]) for key in keys]
+
+
+def _expect_count(vectors: List[List[float]], texts: Sequence[str]) -> List[List[float]]:
+    # embed_texts empareja vectores y textos por posición
+    if len(vectors) != len(texts):
+        raise HuggingFaceRequestError(
+            f"Se esperaban {len(texts)} embeddings y se recibieron {len(vectors)}"
+        )
+    return vectors
+
+
+def _embed_uncached(cleaned: List[str], *, normalize: bool, retries: int, timeout: float) -> List[List[float]]:
     last_error: Exception | None = None
 
     prefer_local = not _FORCE_REMOTE
     if prefer_local:
         try:
-            return _embed_texts_local(cleaned, normalize=normalize)
+            return _expect_count(_embed_texts_local(cleaned, normalize=normalize), cleaned)
         except (HuggingFaceConfigError, HuggingFaceRequestError) as exc:
             last_error = exc
             _LOGGER.debug("Fallo modelo HuggingFace local, intentando API remota si está disponible", exc_info=exc)
@@ -230,7 +375,10 @@ def embed_texts(texts: Sequence[str], *, normalize: bool = True, retries: int =
 
     if _API_TOKEN and not _FORCE_LOCAL:
         try:
-            return _embed_texts_remote(cleaned, normalize=normalize, retries=retries, timeout=timeout)
+            return _expect_count(
+                _embed_texts_remote_batched(cleaned, normalize=normalize, retries=retries, timeout=timeout),
+                cleaned,
+            )
         except HuggingFaceRequestError as exc:
             last_error = exc
 
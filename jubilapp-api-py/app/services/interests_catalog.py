@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
 
 from app.firebase import db as fs
 
@@ -43,42 +45,79 @@ BASE_CATALOG: List[Tuple[str, str]] = [
 ]
 
 
-def _snapshot() -> List:
-    return list(fs.collection("interests_catalog").stream())
+_CATALOG_TTL_SECONDS = 300
+_catalog_cache: Optional[Tuple[float, List[Dict]]] = None
+_catalog_ensured = False
 
 
-def ensure_catalog_firestore() -> None:
-    col = fs.collection("interests_catalog")
-    docs = _snapshot()
+def invalidate_catalog_cache() -> None:
+    global _catalog_cache
+    _catalog_cache = None
+
+
+_NAME_IN_CHUNK = 10  # límite de valores para el operador "in" de Firestore
+_WRITE_CHUNK = 400  # bajo el tope de 500 operaciones por batch
 
-    existing_names = set()
+
+def _existing_names(col, names: List[str]) -> set:
+    existing = set()
+    for start in range(0, len(names), _NAME_IN_CHUNK):
+        chunk = names[start:start + _NAME_IN_CHUNK]
+        for doc in col.where("name", "in", chunk).select(["name"]).stream():
+            name = (doc.to_dict() or {}).get("name")
+            if name:
+                existing.add(name)
+    return existing
+
+
+def _next_catalog_id(col) -> int:
     current_ids: List[int] = []
-    for doc in docs:
+    for doc in col.select(["id"]).stream():
         data = doc.to_dict() or {}
-        name = data.get("name")
-        if name:
-            existing_names.add(name)
         if isinstance(data.get("id"), int):
             current_ids.append(data["id"])
         elif str(doc.id).isdigit():
             current_ids.append(int(doc.id))
+    return (max(current_ids) + 1) if current_ids else 1
 
-    next_id = (max(current_ids) + 1) if current_ids else 1
 
-    batch = fs.batch()
-    to_add = 0
-    for category, name in BASE_CATALOG:
-        if name in existing_names:
-            continue
-        doc_ref = col.document(str(next_id))
-        batch.set(doc_ref, {"id": next_id, "name": name, "category": category})
-        next_id += 1
-        to_add += 1
-    if to_add:
-        batch.commit()
+def ensure_catalog_firestore() -> None:
+    # El catálogo base es estático: basta con sembrarlo una vez por proceso.
+    global _catalog_ensured
+    if _catalog_ensured:
+        return
+
+    col = fs.collection("interests_catalog")
+    existing_names = _existing_names(col, [name for _, name in BASE_CATALOG])
+
+    missing = [(category, name) for category, name in BASE_CATALOG if name not in existing_names]
+    if missing:
+        next_id = _next_catalog_id(col)
+        batches = []
+        for start in range(0, len(missing), _WRITE_CHUNK):
+            batch = fs.batch()
+            for category, name in missing[start:start + _WRITE_CHUNK]:
+                doc_ref = col.document(str(next_id))
+                batch.set(doc_ref, {"id": next_id, "name": name, "category": category})
+                next_id += 1
+            batches.append(batch)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda batch: batch.commit(), batches))
+        invalidate_catalog_cache()
+
+    _catalog_ensured = True
+
+
+def _catalog_sort_key(row: Dict) -> Tuple[str, str]:
+    # "name" siempre es str; "category" puede venir en None desde Firestore.
+    return row["category"] or "", row["name"]
 
 
 def load_catalog() -> List[Dict]:
+    global _catalog_cache
+    if _catalog_cache is not None and monotonic() - _catalog_cache[0] < _CATALOG_TTL_SECONDS:
+        return [dict(row) for row in _catalog_cache[1]]
+
     docs = fs.collection("interests_catalog").stream()
     out: List[Dict] = []
     for doc in docs:
@@ -92,5 +131,6 @@ def load_catalog() -> List[Dict]:
             "name": data.get("name") or "",
             "category": data.get("category"),
         })
-    out.sort(key=lambda row: ((row.get("category") or ""), (row.get("name") or "")))
-    return out
+    out.sort(key=_catalog_sort_key)
+    _catalog_cache = (monotonic(), out)
+    return [dict(row) for row in out]
@@ -7,25 +7,36 @@ from firebase_admin import firestore
 from app.firebase import db
 
 
+def _session_ref(uid: str, session_id: str):
+    return db.collection("interviews").document(uid).collection("sessions").document(session_id)
+
+
 def save_turn(uid: str, session_id: str, turn: Dict[str, Any]) -> None:
-    ref = db.collection("interviews").document(uid).collection("sessions").document(session_id)
-    snapshot = ref.get()
+    """
+    Guarda cada turno como documento en la subcolección `turns` en vez de
+    crecer un arreglo dentro de la sesión. Una lectura proyectada decide si
+    falta `created_at` (sesión nueva, con id del servidor o del cliente) y el
+    resto va en un único commit.
+    """
+    ref = _session_ref(uid, session_id)
+    snapshot = ref.get(field_paths=["created_at"])
     data = {
         "uid": uid,
         "session_id": session_id,
+        "turn_count": firestore.Increment(1),
         "updated_at": firestore.SERVER_TIMESTAMP,
     }
-    if not snapshot.exists:
+    if not snapshot.exists or (snapshot.to_dict() or {}).get("created_at") is None:
         data["created_at"] = firestore.SERVER_TIMESTAMP
-    ref.set(data, merge=True)
 
-    ref.update({
-        "turns": firestore.ArrayUnion([turn]),
-    })
+    batch = db.batch()
+    batch.set(ref, data, merge=True)
+    batch.set(ref.collection("turns").document(), {"created_at": firestore.SERVER_TIMESTAMP, **turn})
+    batch.commit()
 
 
 def finalize_session(uid: str, session_id: str, summary: Dict[str, Any]) -> None:
-    ref = db.collection("interviews").document(uid).collection("sessions").document(session_id)
+    ref = _session_ref(uid, session_id)
     ref.set({
         "summary": summary,
         "status": summary.get("status") or "completed",
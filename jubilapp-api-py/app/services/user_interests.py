@@ -1,8 +1,22 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from contextvars import ContextVar, Token
+from typing import Dict, List, Optional
 
 from app.firebase import db
+from app.services.interests_catalog import load_catalog
+
+
+# Memo por request (uid -> nombres); el middleware de app.main lo reinicia en cada request.
+_interest_cache: ContextVar[Optional[Dict[str, List[str]]]] = ContextVar("interest_cache", default=None)
+
+
+def start_request_cache() -> Token:
+    return _interest_cache.set({})
+
+
+def end_request_cache(token: Token) -> None:
+    _interest_cache.reset(token)
 
 
 def get_user_interest_names(uid: str) -> List[str]:
@@ -12,15 +26,25 @@ def get_user_interest_names(uid: str) -> List[str]:
     when the `interests` array is empty but `interest_ids` is present.
     """
 
+    cache = _interest_cache.get()
+    if cache is not None and uid in cache:
+        return list(cache[uid])
+
+    names = _load_user_interest_names(uid)
+    if cache is not None:
+        cache[uid] = names
+    return list(names)
+
+
+def _load_user_interest_names(uid: str) -> List[str]:
     doc = db.collection("users").document(uid).get()
     data = doc.to_dict() or {}
 
-    names: List[str] = []
-    for item in data.get("interests") or []:
-        if isinstance(item, str):
-            cleaned = item.strip()
-            if cleaned and cleaned not in names:
-                names.append(cleaned)
+    names = list(dict.fromkeys(
+        item.strip()
+        for item in data.get("interests") or []
+        if isinstance(item, str) and item.strip()
+    ))
 
     if names:
         return names
@@ -35,26 +59,12 @@ def get_user_interest_names(uid: str) -> List[str]:
     if not ids:
         return []
 
+    # load_catalog mantiene el catálogo en memoria (TTL), sin leer Firestore en cada llamada.
     catalog: Dict[int, str] = {}
-    for row in db.collection("interests_catalog").stream():
-        payload = row.to_dict() or {}
-        try:
-            raw_id = payload.get("id")
-            row_id = int(raw_id if raw_id is not None else row.id)
-        except (TypeError, ValueError):
-            continue
-
-        name = payload.get("name")
-        if isinstance(name, str):
-            cleaned = name.strip()
-            if cleaned:
-                catalog[row_id] = cleaned
-
-    resolved: List[str] = []
-    for iid in ids:
-        name = catalog.get(iid)
-        if name and name not in resolved:
-            resolved.append(name)
-
-    return resolved
+    for row in load_catalog():
+        name = row.get("name")
+        if isinstance(name, str) and name.strip():
+            catalog[row["id"]] = name.strip()
+
+    return list(dict.fromkeys(catalog[iid] for iid in ids if iid in catalog))
 
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+import concurrent.futures
+import logging
 import mimetypes
 import os
+import threading
 from dataclasses import dataclass
 from datetime import timedelta
-from typing import Optional
+from typing import Iterable, Iterator, Optional, Tuple
 from uuid import uuid4
 
 from google.api_core import exceptions as g_exceptions
+from google.api_core.client_options import ClientOptions
 from google.cloud import speech
 
 from app.firebase import bucket
@@ -23,19 +27,41 @@ class TranscriptionError(RuntimeError):
     pass
 
 
+_LOGGER = logging.getLogger(__name__)
+
 _speech_client: speech.SpeechClient | None = None
+_speech_client_lock = threading.Lock()
 
 
 def _client() -> speech.SpeechClient:
+    # Un solo cliente (y canal gRPC, thread-safe) compartido por todos los hilos.
     global _speech_client
     if _speech_client is None:
-        try:
-            _speech_client = speech.SpeechClient()
-        except Exception as exc:  # pragma: no cover - requiere credenciales válidas
-            raise TranscriptionError(f"No se pudo inicializar SpeechClient: {exc}") from exc
+        with _speech_client_lock:
+            if _speech_client is None:
+                try:
+                    _speech_client = speech.SpeechClient(
+                        transport="grpc",
+                        client_options=ClientOptions(api_endpoint="speech.googleapis.com:443"),
+                    )
+                except Exception as exc:  # pragma: no cover - requiere credenciales válidas
+                    raise TranscriptionError(f"No se pudo inicializar SpeechClient: {exc}") from exc
     return _speech_client
 
 
+def warm_up_client(timeout: float = 5.0) -> None:
+    """Crea el cliente y espera a que el canal gRPC esté listo (handshake TLS hecho)."""
+    try:
+        client = _client()
+        channel = getattr(client.transport, "grpc_channel", None)
+        if channel is not None:
+            import grpc
+
+            grpc.channel_ready_future(channel).result(timeout=timeout)
+    except Exception as exc:  # pragma: no cover - depende de red/credenciales
+        _LOGGER.info("No se pudo precalentar Speech-to-Text: %s", exc)
+
+
 def upload_audio_bytes(uid: str, session_id: str, *, data: bytes, filename: str | None = None,
                        content_type: str | None = None) -> AudioUploadResult:
     if not bucket:
@@ -78,18 +104,20 @@ def _resolve_encoding(mime_type: str | None) -> speech.RecognitionConfig.AudioEn
     return speech.RecognitionConfig.AudioEncoding.LINEAR16
 
 
-def transcribe_audio_bytes(audio_bytes: bytes, *, sample_rate_hz: int | None = None,
-                           language_code: str = "es-CL", mime_type: str | None = None) -> str:
-    if not audio_bytes:
-        raise TranscriptionError("Audio vacío")
-    client = _client()
+# Sobre este tamaño (~1 min de audio) recognize síncrono se rechaza: se usa la
+# variante long-running con el audio ya subido a Storage.
+_SYNC_RECOGNIZE_MAX_BYTES = 800_000
+# Tope de espera dentro de una request; la operación se cancela si lo excede.
+_LONG_RUNNING_TIMEOUT_SECONDS = 120
 
-    audio = speech.RecognitionAudio(content=audio_bytes)
+
+def _recognition_config(*, sample_rate_hz: int | None, language_code: str,
+                        mime_type: str | None) -> speech.RecognitionConfig:
     encoding = _resolve_encoding(mime_type)
     effective_sample_rate = sample_rate_hz
     if effective_sample_rate is None:
         effective_sample_rate = 16000 if encoding == speech.RecognitionConfig.AudioEncoding.AMR_WB else 44100
-    config = speech.RecognitionConfig(
+    return speech.RecognitionConfig(
         encoding=encoding,
         language_code=language_code,
         alternative_language_codes=["es-ES", "es"],
@@ -98,13 +126,8 @@ def transcribe_audio_bytes(audio_bytes: bytes, *, sample_rate_hz: int | None = N
         sample_rate_hertz=effective_sample_rate,
     )
 
-    try:
-        response = client.recognize(config=config, audio=audio)
-    except g_exceptions.GoogleAPIError as exc:
-        raise TranscriptionError(f"Error en Speech-to-Text: {exc}") from exc
-    except Exception as exc:
-        raise TranscriptionError(f"Error inesperado en Speech-to-Text: {exc}") from exc
 
+def _join_transcripts(response) -> str:
     transcripts = []
     for result in response.results:
         if result.alternatives:
@@ -113,3 +136,86 @@ def transcribe_audio_bytes(audio_bytes: bytes, *, sample_rate_hz: int | None = N
     if not transcript:
         raise TranscriptionError("No se obtuvo ninguna transcripción")
     return transcript
+
+
+def transcribe_gcs_uri(uri: str, *, sample_rate_hz: int | None = None,
+                       language_code: str = "es-CL", mime_type: str | None = None) -> str:
+    client = _client()
+    audio = speech.RecognitionAudio(uri=uri)
+    config = _recognition_config(sample_rate_hz=sample_rate_hz, language_code=language_code, mime_type=mime_type)
+
+    try:
+        operation = client.long_running_recognize(config=config, audio=audio)
+    except g_exceptions.GoogleAPIError as exc:
+        raise TranscriptionError(f"Error en Speech-to-Text: {exc}") from exc
+    except Exception as exc:
+        raise TranscriptionError(f"Error inesperado en Speech-to-Text: {exc}") from exc
+
+    try:
+        # result() consulta la operación periódicamente hasta el tope
+        response = operation.result(timeout=_LONG_RUNNING_TIMEOUT_SECONDS)
+    except concurrent.futures.TimeoutError as exc:
+        try:
+            operation.cancel()
+        except Exception:  # pragma: no cover - best effort
+            _LOGGER.debug("No se pudo cancelar la operación de Speech-to-Text", exc_info=True)
+        raise TranscriptionError("La transcripción tardó demasiado") from exc
+    except g_exceptions.GoogleAPIError as exc:
+        raise TranscriptionError(f"Error en Speech-to-Text: {exc}") from exc
+    except Exception as exc:
+        raise TranscriptionError(f"Error inesperado en Speech-to-Text: {exc}") from exc
+
+    return _join_transcripts(response)
+
+
+def transcribe_audio_bytes(audio_bytes: bytes, *, sample_rate_hz: int | None = None,
+                           language_code: str = "es-CL", mime_type: str | None = None,
+                           storage_path: str | None = None) -> str:
+    if not audio_bytes:
+        raise TranscriptionError("Audio vacío")
+
+    if storage_path and bucket and len(audio_bytes) > _SYNC_RECOGNIZE_MAX_BYTES:
+        return transcribe_gcs_uri(
+            f"gs://{bucket.name}/{storage_path}",
+            sample_rate_hz=sample_rate_hz,
+            language_code=language_code,
+            mime_type=mime_type,
+        )
+
+    client = _client()
+    audio = speech.RecognitionAudio(content=audio_bytes)
+    config = _recognition_config(sample_rate_hz=sample_rate_hz, language_code=language_code, mime_type=mime_type)
+
+    try:
+        response = client.recognize(config=config, audio=audio)
+    except g_exceptions.GoogleAPIError as exc:
+        raise TranscriptionError(f"Error en Speech-to-Text: {exc}") from exc
+    except Exception as exc:
+        raise TranscriptionError(f"Error inesperado en Speech-to-Text: {exc}") from exc
+
+    return _join_transcripts(response)
+
+
+def stream_transcribe(audio_chunks: Iterable[bytes], *, sample_rate_hz: int | None = None,
+                      language_code: str = "es-CL", mime_type: str | None = None,
+                      single_utterance: bool = False) -> Iterator[Tuple[str, bool]]:
+    """
+    Envía los trozos de audio a streaming_recognize a medida que llegan y va
+    entregando (texto, es_final). Bloqueante: pensado para correr en un hilo
+    alimentado por una cola (ver /voice/stream). Trozos de ~750 ms funcionan bien.
+    """
+    client = _client()
+    streaming_config = speech.StreamingRecognitionConfig(
+        config=_recognition_config(sample_rate_hz=sample_rate_hz, language_code=language_code, mime_type=mime_type),
+        interim_results=True,
+        single_utterance=single_utterance,
+    )
+    requests = (speech.StreamingRecognizeRequest(audio_content=chunk) for chunk in audio_chunks if chunk)
+
+    try:
+        for response in client.streaming_recognize(config=streaming_config, requests=requests):
+            for result in response.results:
+                if result.alternatives:
+                    yield result.alternatives[0].transcript.strip(), bool(result.is_final)
+    except g_exceptions.GoogleAPIError as exc:
+        raise TranscriptionError(f"Error en Speech-to-Text: {exc}") from exc
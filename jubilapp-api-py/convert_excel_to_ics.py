@@ -4,7 +4,7 @@ from __future__ import annotations
 import argparse
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
 
 try:
     from zoneinfo import ZoneInfo
@@ -21,13 +21,11 @@ from import_chilecultura_excel import (
 SANTIAGO_TZ = ZoneInfo("America/Santiago") if ZoneInfo else None
 
 
+_ICS_ESCAPES = str.maketrans({"\\": "\\\\", "\n": "\\n", ",": "\\,", ";": "\\;"})
+
+
 def _escape_ics(text: str) -> str:
-    return (
-        text.replace("\\", "\\\\")
-        .replace("\n", "\\n")
-        .replace(",", "\\,")
-        .replace(";", "\\;")
-    )
+    return text.translate(_ICS_ESCAPES)
 
 
 def _format_datetime(value: datetime) -> str:
@@ -44,7 +42,7 @@ def _format_allday(value: datetime) -> str:
     return value.strftime("%Y%m%d")
 
 
-def _build_event(row: dict) -> Optional[List[str]]:
+def _build_event(row: dict) -> Optional[Tuple[str, List[str]]]:
     title = clean_value(row.get("titulo") or row.get("title")) or "Evento"
     link = clean_value(row.get("link") or row.get("url"))
     location = clean_value(row.get("lugar")) or clean_value(row.get("ciudad_region"))
@@ -111,39 +109,41 @@ def _build_event(row: dict) -> Optional[List[str]]:
 
     lines.append("STATUS:CONFIRMED")
     lines.append("END:VEVENT")
-    return lines
+    return uid_seed, lines
 
 
-def _convert(paths: Iterable[Path]) -> Tuple[List[str], int]:
-    events: List[str] = []
-    total = 0
+def _iter_events(paths: Iterable[Path]) -> Iterator[List[str]]:
     seen_ids = set()
     for path in paths:
         for row in load_records(path):
-            event_lines = _build_event(row)
-            if not event_lines:
+            built = _build_event(row)
+            if not built:
                 continue
-            uid_line = next((line for line in event_lines if line.startswith("UID:")), None)
-            if uid_line and uid_line in seen_ids:
+            uid_seed, event_lines = built
+            if uid_seed in seen_ids:
                 continue
-            if uid_line:
-                seen_ids.add(uid_line)
-            events.extend(event_lines)
-            total += 1
-    return events, total
-
-
-def build_calendar(events: List[str]) -> str:
-    header = [
-        "BEGIN:VCALENDAR",
-        "PRODID:-//Jubilapp//Eventos importados//ES",
-        "VERSION:2.0",
-        "CALSCALE:GREGORIAN",
-        "METHOD:PUBLISH",
-    ]
-    footer = ["END:VCALENDAR"]
-    content = header + events + footer
-    return "\r\n".join(content) + "\r\n"
+            seen_ids.add(uid_seed)
+            yield event_lines
+
+
+CALENDAR_HEADER = (
+    "BEGIN:VCALENDAR",
+    "PRODID:-//Jubilapp//Eventos importados//ES",
+    "VERSION:2.0",
+    "CALSCALE:GREGORIAN",
+    "METHOD:PUBLISH",
+)
+
+
+def write_calendar(handle: TextIO, events: Iterable[List[str]]) -> int:
+    """Escribe el calendario evento por evento; devuelve cuántos eventos se escribieron."""
+    handle.write("\r\n".join(CALENDAR_HEADER) + "\r\n")
+    total = 0
+    for event_lines in events:
+        handle.write("\r\n".join(event_lines) + "\r\n")
+        total += 1
+    handle.write("END:VCALENDAR\r\n")
+    return total
 
 
 def main() -> None:
@@ -153,11 +153,9 @@ def main() -> None:
     args = parser.parse_args()
 
     input_paths = [Path(value).expanduser() for value in args.input]
-    events, total = _convert(input_paths)
-    calendar = build_calendar(events)
-
     output_path = Path(args.output).expanduser()
-    output_path.write_text(calendar, encoding="utf-8")
+    with output_path.open("w", encoding="utf-8", newline="") as handle:
+        total = write_calendar(handle, _iter_events(input_paths))
     print(f"Archivo ICS generado: {output_path} ({total} eventos)")
 
 
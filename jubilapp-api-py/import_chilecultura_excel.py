@@ -15,14 +15,18 @@ Requisitos:
 from __future__ import annotations
 
 import argparse
+import asyncio
 import csv
 import re
+import threading
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from hashlib import md5
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from xml.etree import ElementTree as ET
 
 try:
@@ -30,9 +34,26 @@ try:
 except ImportError:  # pragma: no cover - dependencia opcional
     pd = None  # type: ignore[assignment]
 
-from firebase_admin import firestore
+try:
+    import openpyxl  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - dependencia opcional
+    openpyxl = None  # type: ignore[assignment]
+
+from firebase_admin import firestore, firestore_async
+from google.api_core.exceptions import AlreadyExists
+
+from app.firebase import db  # noqa: F401 - inicializa la app por defecto de firebase_admin
 
-from app.firebase import db
+_COLUMN_RE = re.compile(r"([A-Za-z]+)")
+# dd-mm-aaaa, aaaa-mm-dd, dd/mm/aa... (mismo separador en ambos lados)
+_DATE_RE = re.compile(r"^(\d{1,4})([-/])(\d{1,2})\2(\d{1,4})$")
+
+# Escrituras en vuelo simultáneas contra Firestore.
+WRITE_CONCURRENCY = 200
+# Filas procesadas en paralelo; el re-scrape a ChileCultura se limita aparte.
+PAYLOAD_WORKERS = 32
+PAYLOAD_CHUNK_SIZE = PAYLOAD_WORKERS * 16
+_FETCH_SEMAPHORE = threading.Semaphore(8)
 
 KEYWORD_INTERESTS: List[Tuple[str, str]] = [
     ("yoga", "Gimnasia suave / yoga / pilates"),
@@ -54,6 +75,8 @@ KEYWORD_INTERESTS: List[Tuple[str, str]] = [
     ("medit", "Meditación / mindfulness"),
     ("artesan", "Manualidades / artesanía"),
 ]
+# Una sola pasada sobre el texto; el lookahead permite coincidencias solapadas.
+_KEYWORD_RE = re.compile("(?=(" + "|".join(re.escape(keyword) for keyword, _ in KEYWORD_INTERESTS) + "))")
 
 
 @dataclass
@@ -108,22 +131,10 @@ def _parse_datetime(date_str: Optional[str], time_str: Optional[str]) -> Optiona
     date_str = date_str.strip()
     if not date_str:
         return None
-    dt_format_candidates = (
-        "%Y-%m-%d",
-        "%d-%m-%Y",
-        "%Y/%m/%d",
-        "%d/%m/%Y",
-        "%d/%m/%y",
-        "%d-%m-%y",
-    )
     date_obj: Optional[datetime] = None
-    for fmt in dt_format_candidates:
-        try:
-            date_obj = datetime.strptime(date_str, fmt)
-            break
-        except ValueError:
-            continue
-    if date_obj is None:
+    if "-" in date_str or "/" in date_str:
+        date_obj = _match_date(date_str)
+    else:
         # Excel serial number (days since 1899-12-30)
         try:
             serial = float(date_str)
@@ -164,11 +175,37 @@ def _parse_datetime(date_str: Optional[str], time_str: Optional[str]) -> Optiona
     return datetime.combine(date_obj.date(), datetime.min.time())
 
 
+def _match_date(text: str) -> Optional[datetime]:
+    match = _DATE_RE.match(text)
+    if not match:
+        return None
+    first, _, month, last = match.groups()
+    if len(first) == 4 and len(last) <= 2:
+        year, day = int(first), int(last)
+    elif len(first) <= 2 and len(last) == 4:
+        year, day = int(last), int(first)
+    elif len(first) <= 2 and len(last) == 2:
+        # Misma ventana que %y: 69-99 -> 19xx, 00-68 -> 20xx
+        short = int(last)
+        year, day = (1900 + short if short >= 69 else 2000 + short), int(first)
+    else:
+        return None
+    try:
+        return datetime(year, int(month), day)
+    except ValueError:
+        return None
+
+
 def _detect_tags(*chunks: Optional[str]) -> Optional[List[str]]:
-    haystack = " ".join(chunk or "" for chunk in chunks).lower()
+    haystack = " ".join(chunk for chunk in chunks if chunk).lower()
+    if not haystack:
+        return None
+    found = {match.group(1) for match in _KEYWORD_RE.finditer(haystack)}
+    if not found:
+        return None
     tags: List[str] = []
     for keyword, interest in KEYWORD_INTERESTS:
-        if keyword in haystack and interest not in tags:
+        if keyword in found and interest not in tags:
             tags.append(interest)
         if len(tags) >= 3:
             break
@@ -183,7 +220,7 @@ def _doc_id(titulo: Optional[str], fecha_inicio: Optional[str], link: Optional[s
 
 
 def _column_index(cell_ref: str) -> int:
-    match = re.match(r"([A-Za-z]+)", cell_ref or "")
+    match = _COLUMN_RE.match(cell_ref or "")
     if not match:
         return 0
     letters = match.group(1).upper()
@@ -193,89 +230,105 @@ def _column_index(cell_ref: str) -> int:
     return index - 1
 
 
-def _read_xlsx_without_pandas(path: Path) -> List[List[str]]:
+_XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def _read_xlsx_without_pandas(path: Path) -> Iterator[List[str]]:
+    # iterparse + clear(): solo el <si>/<row> actual queda en memoria.
     with zipfile.ZipFile(path) as archive:
         shared_strings: List[str] = []
         if "xl/sharedStrings.xml" in archive.namelist():
-            raw_shared = archive.read("xl/sharedStrings.xml")
-            namespace = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
-            shared_root = ET.fromstring(raw_shared)
-            for entry in shared_root.findall("main:si", namespace):
-                chunks: List[str] = []
-                for node in entry.findall(".//main:t", namespace):
-                    chunks.append(node.text or "")
-                shared_strings.append("".join(chunks))
-
-        sheet_name = "xl/worksheets/sheet1.xml"
-        raw_sheet = archive.read(sheet_name)
-
-    namespace = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
-    root = ET.fromstring(raw_sheet)
-    rows: List[List[str]] = []
-
-    for row in root.findall("main:sheetData/main:row", namespace):
-        values: List[str] = []
-        for cell in row.findall("main:c", namespace):
-            ref = cell.get("r") or ""
-            index = max(_column_index(ref), 0)
-            while len(values) <= index:
-                values.append("")
-
-            cell_type = cell.get("t")
-            value = ""
-            if cell_type == "inlineStr":
-                pieces = []
-                for node in cell.findall(".//main:t", namespace):
-                    pieces.append(node.text or "")
-                value = "".join(pieces)
-            else:
-                raw_value = cell.find("main:v", namespace)
-                text = raw_value.text if raw_value is not None else None
-                if cell_type == "s" and text and text.isdigit():
-                    try:
-                        value = shared_strings[int(text)]
-                    except (IndexError, ValueError):
-                        value = text
-                elif text is not None:
+            with archive.open("xl/sharedStrings.xml") as handle:
+                for _, elem in ET.iterparse(handle, events=("end",)):
+                    if elem.tag == f"{_XLSX_NS}si":
+                        shared_strings.append("".join(node.text or "" for node in elem.iter(f"{_XLSX_NS}t")))
+                        elem.clear()
+
+        with archive.open("xl/worksheets/sheet1.xml") as handle:
+            for _, elem in ET.iterparse(handle, events=("end",)):
+                if elem.tag != f"{_XLSX_NS}row":
+                    continue
+                yield _xlsx_row_values(elem, shared_strings)
+                elem.clear()
+
+
+def _xlsx_row_values(row, shared_strings: List[str]) -> List[str]:
+    values: List[str] = []
+    for cell in row.iter(f"{_XLSX_NS}c"):
+        ref = cell.get("r") or ""
+        index = max(_column_index(ref), 0)
+        while len(values) <= index:
+            values.append("")
+
+        cell_type = cell.get("t")
+        value = ""
+        if cell_type == "inlineStr":
+            value = "".join(node.text or "" for node in cell.iter(f"{_XLSX_NS}t"))
+        else:
+            raw_value = cell.find(f"{_XLSX_NS}v")
+            text = raw_value.text if raw_value is not None else None
+            if cell_type == "s" and text and text.isdigit():
+                try:
+                    value = shared_strings[int(text)]
+                except (IndexError, ValueError):
                     value = text
-            values[index] = value
-        rows.append(values)
-
-    return rows
-
-
-def _load_records(path: Path) -> List[Dict[str, object]]:
+            elif text is not None:
+                value = text
+        values[index] = value
+    return values
+
+
+def _iter_xlsx_openpyxl(path: Path) -> Iterable[Dict[str, object]]:
+    # read_only recorre las filas en streaming sin materializar el libro completo.
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if not header_row:
+            return
+        header = [str(col).strip() if col is not None else "" for col in header_row]
+        for values in rows:
+            yield {
+                key: _clean_value(value)
+                for key, value in zip(header, values)
+                if key
+            }
+    finally:
+        workbook.close()
+
+
+def _load_records(path: Path) -> Iterator[Dict[str, object]]:
+    # Generador: los lectores en streaming (openpyxl, XML, csv) no materializan el archivo.
     suffix = path.suffix.lower()
-    raw_rows: List[Dict[str, object]] = []
+    raw_rows: Iterable[Dict[str, object]]
 
+    if suffix == ".xlsx" and openpyxl is not None:
+        yield from _iter_xlsx_openpyxl(path)
+        return
     if suffix in {".xls", ".xlsx"} and pd is not None:
         df = pd.read_excel(path)
         raw_rows = df.to_dict(orient="records")
     elif suffix in {".xls", ".xlsx"}:
         rows = _read_xlsx_without_pandas(path)
-        if not rows:
-            return []
-        header = [col.strip() for col in rows[0]]
-        for row in rows[1:]:
-            record: Dict[str, object] = {}
-            for idx, key in enumerate(header):
-                if not key:
-                    continue
-                record[key] = row[idx] if idx < len(row) else None
-            raw_rows.append(record)
+        header_row = next(rows, None)
+        if header_row is None:
+            return
+        header = [col.strip() for col in header_row]
+        raw_rows = (
+            {key: row[idx] if idx < len(row) else None for idx, key in enumerate(header) if key}
+            for row in rows
+        )
     elif pd is not None:
         df = pd.read_csv(path)
         raw_rows = df.to_dict(orient="records")
     else:
         with path.open(newline="", encoding="utf-8") as handle:
-            reader = csv.DictReader(handle)
-            raw_rows = list(reader)
+            for raw in csv.DictReader(handle):
+                yield {key: _clean_value(value) for key, value in raw.items()}
+        return
 
-    records: List[Dict[str, object]] = []
     for raw in raw_rows:
-        cleaned = {key: _clean_value(value) for key, value in raw.items()}
-        records.append(cleaned)
-    return records
+        yield {key: _clean_value(value) for key, value in raw.items()}
 
 
 def _build_payload(row: Dict[str, object]) -> Tuple[Optional[Dict[str, object]], Optional[str]]:
@@ -306,7 +359,8 @@ def _build_payload(row: Dict[str, object]) -> Tuple[Optional[Dict[str, object]],
             fetch = parse_event_page = None  # type: ignore[assignment]
         if fetch and parse_event_page:
             try:
-                html = fetch(str(link))
+                with _FETCH_SEMAPHORE:
+                    html = fetch(str(link))
             except Exception:
                 html = None
             if html:
@@ -377,43 +431,73 @@ def _build_payload(row: Dict[str, object]) -> Tuple[Optional[Dict[str, object]],
     return cleaned_payload, None
 
 
-def _import_file(path: Path, *, dry_run: bool = False) -> ImportSummary:
-    print(f"Procesando {path}...")
-    records = _load_records(path)
-    collection = db.collection("activities")
-    summary = ImportSummary()
+async def _write_payloads(prepared: List[Tuple[str, Dict[str, object]]], summary: ImportSummary) -> None:
+    """
+    Escritura optimista sin lecturas previas, con muchas RPC en vuelo sobre el
+    cliente async: cada documento se intenta crear (con createdAt); si ya existe
+    se escribe con set(merge=True) sin createdAt y se cuenta como actualizado.
+    """
+    # Filas repetidas en el archivo se fusionan en una sola escritura (la última gana).
+    merged: Dict[str, Dict[str, object]] = {}
+    for doc_id, payload in prepared:
+        if doc_id in merged:
+            merged[doc_id].update(payload)
+            summary.updated += 1
+        else:
+            merged[doc_id] = {**payload, "updatedAt": firestore.SERVER_TIMESTAMP}
 
-    for row in records:
-        payload, error = _build_payload(row)
-        if not payload:
-            summary.skipped += 1
-            if error:
-                print(f"  - Omitido ({error}): {row.get('titulo') or row.get('title')}")
-            continue
+    # firestore_async cachea el cliente por app: todos los archivos corren en un
+    # único asyncio.run (ver main) para que su canal gRPC no quede en un loop cerrado.
+    collection = firestore_async.client().collection("activities")
+    semaphore = asyncio.Semaphore(WRITE_CONCURRENCY)
 
-        doc_id = _doc_id(
-            str(row.get("titulo") or ""),
-            str(row.get("fecha_inicio") or ""),
-            str(row.get("link") or ""),
-        )
+    async def write(doc_id: str, data: Dict[str, object]) -> bool:
+        doc_ref = collection.document(doc_id)
+        async with semaphore:
+            try:
+                await doc_ref.create({**data, "createdAt": firestore.SERVER_TIMESTAMP})
+                return True
+            except AlreadyExists:
+                await doc_ref.set(data, merge=True)
+                return False
 
-        if dry_run:
-            summary.created += 1
-            continue
+    results = await asyncio.gather(*(write(doc_id, data) for doc_id, data in merged.items()))
+    created = sum(results)
+    summary.created += created
+    summary.updated += len(results) - created
 
-        doc_ref = collection.document(doc_id)
-        snapshot = doc_ref.get()
 
-        timestamps = {"updatedAt": firestore.SERVER_TIMESTAMP}
-        data = {**payload, **timestamps}
+async def _import_file(path: Path, *, dry_run: bool = False) -> ImportSummary:
+    print(f"Procesando {path}...")
+    records = _load_records(path)
+    summary = ImportSummary()
+    prepared: List[Tuple[str, Dict[str, object]]] = []
+
+    # _build_payload puede re-scrapear el detalle (I/O); map conserva el orden.
+    # Las filas se consumen por bloques para no cargar el archivo entero en memoria.
+    with ThreadPoolExecutor(max_workers=PAYLOAD_WORKERS) as executor:
+        while True:
+            chunk = list(islice(records, PAYLOAD_CHUNK_SIZE))
+            if not chunk:
+                break
+            for row, (payload, error) in zip(chunk, executor.map(_build_payload, chunk)):
+                if not payload:
+                    summary.skipped += 1
+                    if error:
+                        print(f"  - Omitido ({error}): {row.get('titulo') or row.get('title')}")
+                    continue
 
-        if snapshot.exists:
-            doc_ref.set(data, merge=True)
-            summary.updated += 1
-        else:
-            data["createdAt"] = firestore.SERVER_TIMESTAMP
-            doc_ref.set(data, merge=True)
-            summary.created += 1
+                doc_id = _doc_id(
+                    str(row.get("titulo") or ""),
+                    str(row.get("fecha_inicio") or ""),
+                    str(row.get("link") or ""),
+                )
+                prepared.append((doc_id, payload))
+
+    if dry_run:
+        summary.created += len(prepared)
+    elif prepared:
+        await _write_payloads(prepared, summary)
 
     print(f"  -> {summary.created} creados, {summary.updated} actualizados, {summary.skipped} omitidos")
     return summary
@@ -432,21 +516,25 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def main() -> None:
-    args = parse_args()
-    files: List[Path] = [Path(item).expanduser() for item in args.input]
-
+async def _import_files(files: List[Path], *, dry_run: bool) -> ImportSummary:
     totals = ImportSummary()
     for file_path in files:
         if not file_path.exists():
             print(f"[!] Archivo no encontrado: {file_path}")
             continue
 
-        summary = _import_file(file_path, dry_run=args.dry_run)
+        summary = await _import_file(file_path, dry_run=dry_run)
         totals.created += summary.created
         totals.updated += summary.updated
         totals.skipped += summary.skipped
+    return totals
+
+
+def main() -> None:
+    args = parse_args()
+    files: List[Path] = [Path(item).expanduser() for item in args.input]
 
+    totals = asyncio.run(_import_files(files, dry_run=args.dry_run))
     print("Resumen global:", totals.as_dict())
 
 
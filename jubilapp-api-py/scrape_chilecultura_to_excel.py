@@ -7,30 +7,49 @@ Scrape ChileCultura (https://chilecultura.gob.cl) events into an Excel/CSV file.
 - Filters: you can set FREE_ONLY, REGION, and a MAX_PAGES cap for demos.
 USO:
   python scrape_chilecultura_to_excel.py --free --region "Valparaíso" --max-pages 5 --out eventos_chilecultura.xlsx
+DEPENDENCIAS (httpx, lxml, requests; pandas + openpyxl para .xlsx; orjson opcional):
+  pip install -r requirements-scraper.txt
 """
 import argparse
+import asyncio
 import csv
 import json
+import operator
+import os
 import time
 import re
 import unicodedata
-from dataclasses import dataclass, asdict, field
-from typing import Optional, List, Tuple, Dict, Any
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional, List, Tuple, Dict, Any, Union
 from urllib.parse import urljoin
 
+import httpx
+import lxml.etree
+import lxml.html
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except covers both
+_json_loads = orjson.loads if orjson is not None else json.loads
 
 BASE = "https://chilecultura.gob.cl"
 LISTING = BASE + "/events/search/"
 HEADERS = {
     "User-Agent": "JubilApp-scraper/1.0 (+https://example.local)",
-    "Accept-Language": "es-CL,es;q=0.9"
+    "Accept-Language": "es-CL,es;q=0.9",
 }
 
 # --- Polite settings ---
 REQUEST_DELAY = 1.0  # seconds between requests (adjust if needed)
 TIMEOUT = 12
+CONCURRENCY = 8  # event pages in flight; request starts are spaced REQUEST_DELAY / CONCURRENCY apart
 
 FREE_KEYWORDS = (
     "gratis",
@@ -45,23 +64,82 @@ FREE_KEYWORDS = (
 )
 REGION_FIELDS = ("titulo", "lugar", "ciudad_region")
 
+# --- Precompiled patterns (parse_event_page runs them on every event) ---
+_RE_WS = re.compile(r"\s+")
+_RE_REGION = re.compile(r"Regi[oó]n\s+de\s+([A-Za-zÁÉÍÓÚÑñ\s]+)")
+_RE_REGION_META = re.compile(r"(Regi[oó]n(?:\s+de)?\s+[A-Za-zÁÉÍÓÚÑñ\s]+)")
+_RE_LUGAR = re.compile(r"(Lugar|Ubicaci[oó]n)\s*:\s*(.+?)(?:\s{2,}|$)")
+_RE_LUGAR_META = re.compile(r"(Lugar|Ubicaci[oó]n)\s*[:\-]\s*(.+)", re.IGNORECASE)
+_RE_PRICE = re.compile(r"(\$|clp)\s*\d[\d\.]*", re.IGNORECASE)
+_RE_ISODT = re.compile(r"(\d{4}-\d{2}-\d{2})[T\s](\d{2}:\d{2})")
+_RE_TIME = re.compile(r"(\d{1,2}:\d{2})")
+_RE_DATE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+_RE_ADDR = re.compile(r"(calle|plaza|teatro|museo|parque|biblioteca|centro cultural)[^\.]{10,80}", re.IGNORECASE)
+# One scan of the page for any FREE_KEYWORDS (stops at the first hit)
+_RE_FREE = re.compile("|".join(re.escape(keyword) for keyword in FREE_KEYWORDS))
+
+# Sesión compartida: keep-alive entre páginas (y entre hilos del importador).
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=Retry(total=3, backoff_factor=0.2)),
+)
+
 # --- Helpers ---
 def fetch(url: str) -> Optional[str]:
     time.sleep(REQUEST_DELAY)
-    r = requests.get(url, headers=HEADERS, timeout=TIMEOUT)
+    r = SESSION.get(url, timeout=TIMEOUT)
     if r.status_code == 200:
         return r.text
     return None
 
+class _RateLimiter:
+    """Shared across all fetches: spaces request starts `interval` seconds apart."""
+
+    def __init__(self, interval: float):
+        self._interval = interval
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+async def fetch_async(
+    client: httpx.AsyncClient, url: str, sem: asyncio.Semaphore, limiter: _RateLimiter
+) -> Optional[Tuple[bytes, str]]:
+    # Raw body + its charset: lxml decodes the bytes itself, no intermediate str
+    async with sem:
+        await limiter.wait()
+        try:
+            r = await client.get(url)
+        except httpx.HTTPError:
+            return None
+    if r.status_code == 200 and r.content:
+        return r.content, r.encoding
+    return None
+
+def _parse_html(html: Union[str, bytes], encoding: Optional[str] = None) -> lxml.html.HtmlElement:
+    if isinstance(html, bytes):
+        # Same charset httpx would use for .text (header, else utf-8)
+        return lxml.html.document_fromstring(html, parser=lxml.html.HTMLParser(encoding=encoding))
+    return lxml.html.document_fromstring(html)
+
 def norm_text(s: Optional[str]) -> str:
-    return re.sub(r"\s+", " ", (s or "").strip())
+    return _RE_WS.sub(" ", (s or "").strip())
 
 def normalize_for_match(value: Optional[str]) -> str:
     """Lowercase + strip + remove diacritics to ease substring matching."""
     if not value:
         return ""
-    value = unicodedata.normalize("NFD", value)
-    value = "".join(ch for ch in value if unicodedata.category(ch) != "Mn")
+    if not value.isascii():
+        value = unicodedata.normalize("NFD", value)
+        value = "".join(ch for ch in value if unicodedata.category(ch) != "Mn")
     return value.lower().strip()
 
 def build_region_terms(region: Optional[str], aliases: Optional[List[str]] = None) -> Tuple[List[str], List[str]]:
@@ -96,12 +174,8 @@ def build_region_terms(region: Optional[str], aliases: Optional[List[str]] = Non
 def passes_region_filter(item: "EventItem", normalized_terms: List[str]) -> bool:
     if not normalized_terms:
         return True
-    candidates = []
-    for field_name in REGION_FIELDS:
-        candidates.append(getattr(item, field_name, ""))
-    candidates.append(item.search_blob)
-    for candidate in candidates:
-        norm_value = normalize_for_match(candidate)
+    for attr in _NORM_FIELDS:
+        norm_value = getattr(item, attr)
         if not norm_value:
             continue
         for term in normalized_terms:
@@ -109,56 +183,90 @@ def passes_region_filter(item: "EventItem", normalized_terms: List[str]) -> bool
                 return True
     return False
 
-def deduplicate_items(items: List["EventItem"]) -> List["EventItem"]:
+def deduplicate_items(items: List["EventItem"], seen: Optional[set] = None) -> List["EventItem"]:
+    # Pass the same `seen` set across calls to deduplicate incrementally
     deduped: List[EventItem] = []
-    seen = set()
+    seen = set() if seen is None else seen
     for item in items:
-        key = (normalize_for_match(item.titulo), item.fecha_inicio, item.link or "")
+        key = (item._norm_titulo, item.fecha_inicio, item.link or "")
         if key in seen:
             continue
         seen.add(key)
         deduped.append(item)
     return deduped
 
-def find_next_page(soup: BeautifulSoup) -> Optional[str]:
-    # Look for pagination "»" or rel="next"
-    a = soup.find("a", rel="next")
-    if a and a.get("href"):
-        return urljoin(BASE, a["href"])
-    # fallback: last "»" link
-    for a in soup.select("a"):
-        if a.get_text(strip=True) in {">", "»", "Siguiente", "Next"} and a.get("href"):
-            return urljoin(BASE, a["href"])
+# XPath del listado: el filtro de hrefs corre en C dentro de lxml.
+_XPATH_EVENT_HREFS = (
+    "//a[starts-with(normalize-space(@href), '/events/')"
+    " and not(starts-with(normalize-space(@href), '/events/search'))]/@href"
+)
+_XPATH_NEXT_REL = "//a[@href][contains(concat(' ', normalize-space(@rel), ' '), ' next ')]/@href"
+_XPATH_NEXT_TEXT = (
+    "//a[@href][normalize-space(string()) = '>' or normalize-space(string()) = '»'"
+    " or normalize-space(string()) = 'Siguiente' or normalize-space(string()) = 'Next']/@href"
+)
+
+def find_next_page(tree: lxml.html.HtmlElement) -> Optional[str]:
+    # Look for pagination rel="next", then "»"-style links
+    for xpath in (_XPATH_NEXT_REL, _XPATH_NEXT_TEXT):
+        hrefs = tree.xpath(xpath)
+        if hrefs:
+            return urljoin(BASE, hrefs[0])
     return None
 
-def extract_event_links_from_listing(html: str) -> List[str]:
-    soup = BeautifulSoup(html, "html.parser")
-    links = set()
+def extract_event_links_from_listing(tree: lxml.html.HtmlElement) -> List[str]:
     # typical cards linking to /events/<id>/
-    for a in soup.select("a"):
-        href = a.get("href", "")
-        if not href:
-            continue
-        href = href.strip()
-        if not href.startswith("/events/"):
-            continue
-        if href.startswith("/events/search"):
-            continue
-        normalized_href = href.split("#", 1)[0].split("?", 1)[0].rstrip("/")
-        if normalized_href == "/events":
-            continue
-        if normalized_href:
+    links = set()
+    for href in tree.xpath(_XPATH_EVENT_HREFS):
+        normalized_href = href.strip().split("#", 1)[0].split("?", 1)[0].rstrip("/")
+        if normalized_href and normalized_href != "/events":
             links.add(urljoin(BASE, normalized_href + "/"))
     return sorted(links)
 
-def load_jsonld(soup: BeautifulSoup) -> List[Dict[str, Any]]:
+def _has_class(*names: str) -> str:
+    # XPath equivalent of a CSS ".name" selector (class token match)
+    return " or ".join(f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')" for name in names)
+
+# XPath de la página de evento (equivalentes a los selectores CSS previos)
+_XPATH_JSONLD = "//script[@type='application/ld+json']"
+_XPATH_HEADING = "(//h1 | //h2)[1]"
+# Meta containers in one pass, in document order
+_XPATH_META_BLOCKS = (
+    "//*[((self::section or self::div) and ("
+    + _has_class("event-meta", "evento-meta", "meta", "event-info", "evento-info")
+    + ")) or "
+    + _has_class("breadcrumb", "breadcrumbs", "chips", "tags", "event-tags")
+    + " or self::address]"
+)
+_XPATH_DESCRIPTION = (
+    "//*[@id='descripcion']",
+    "//*[" + _has_class("descripcion") + "]",
+    "//*[" + _has_class("description") + "]",
+    "//*[" + _has_class("content") + "]",
+    "//*[" + _has_class("entry-content") + "]",
+)
+_XPATH_TIME_START = "//time[@itemprop='startDate']"
+_XPATH_TIME_ANY = "//time[@datetime]"
+_XPATH_TIME_END = "//time[@itemprop='endDate']"
+# Text nodes of every badge in one query (no per-element traversal in Python)
+_XPATH_BADGE_TEXT = "//*[" + _has_class("badge", "tag", "chip", "etiqueta") + "]//text()"
+
+def _first(tree: lxml.html.HtmlElement, xpath: str) -> Optional[lxml.html.HtmlElement]:
+    found = tree.xpath(xpath)
+    return found[0] if found else None
+
+def _el_text(el: lxml.html.HtmlElement) -> str:
+    # Mirrors bs4 get_text(" "): text nodes joined by a space
+    return norm_text(" ".join(el.xpath(".//text()")))
+
+def load_jsonld(tree: lxml.html.HtmlElement) -> List[Dict[str, Any]]:
     payloads: List[Dict[str, Any]] = []
-    for script in soup.find_all("script", type="application/ld+json"):
-        text = script.string
+    for script in tree.xpath(_XPATH_JSONLD):
+        text = script.text
         if not text:
             continue
         try:
-            data = json.loads(text)
+            data = _json_loads(text)
         except json.JSONDecodeError:
             continue
         if isinstance(data, list):
@@ -174,7 +282,7 @@ def ensure_list(value: Any) -> List[Any]:
         return value
     return [value] if value is not None else []
 
-@dataclass
+@dataclass(slots=True)
 class EventItem:
     titulo: str = ""
     lugar: str = ""
@@ -188,14 +296,46 @@ class EventItem:
     es_gratis: bool = False
     link: str = ""
     search_blob: str = field(default="", repr=False, compare=False)
-
-EXPORT_FIELDS = [name for name in EventItem.__dataclass_fields__.keys() if name != "search_blob"]
-
-def parse_event_page(html: str, url: str) -> EventItem:
-    soup = BeautifulSoup(html, "html.parser")
+    # Formas normalizadas (normalize_for_match) calculadas una vez al parsear
+    _norm_titulo: str = field(default="", repr=False, compare=False)
+    _norm_lugar: str = field(default="", repr=False, compare=False)
+    _norm_ciudad_region: str = field(default="", repr=False, compare=False)
+    _norm_search_blob: str = field(default="", repr=False, compare=False)
+
+EXPORT_FIELDS = [
+    name for name in EventItem.__dataclass_fields__.keys()
+    if name != "search_blob" and not name.startswith("_")
+]
+_GET_EXPORT = operator.attrgetter(*EXPORT_FIELDS)
+_NORM_FIELDS = tuple("_norm_" + name for name in REGION_FIELDS + ("search_blob",))
+
+def _cache_normalized(item: EventItem) -> None:
+    for attr in _NORM_FIELDS:
+        setattr(item, attr, normalize_for_match(getattr(item, attr[len("_norm_"):])))
+
+# JSON-LD offer prices that mean "free"
+_FREE_PRICES = (None, "", "0", "0.0", 0, 0.0)
+
+def _apply_offers(item: EventItem, offers: List[Dict[str, Any]]) -> None:
+    for offer in offers:
+        price = offer.get("price")
+        if price in _FREE_PRICES:
+            item.es_gratis = True
+            item.precio_info = item.precio_info or "Gratis"
+        elif isinstance(price, (int, float)):
+            item.precio_info = item.precio_info or f"{offer.get('priceCurrency','CLP')} {price}"
+        elif isinstance(price, str):
+            price_str = norm_text(price)
+            if price_str:
+                item.precio_info = item.precio_info or price_str
+
+def parse_event_page(html: Union[str, bytes], url: str, encoding: Optional[str] = None) -> EventItem:
+    tree = _parse_html(html, encoding)
     item = EventItem(link=url)
 
-    jsonld_entries = load_jsonld(soup)
+    jsonld_entries = load_jsonld(tree)
+    # JSON-LD already read: drop non-visible nodes so text extraction is a plain C walk
+    lxml.etree.strip_elements(tree, lxml.etree.Comment, "script", "style", "template", with_tail=False)
     event_ld: Optional[Dict[str, Any]] = None
     for entry in jsonld_entries:
         types = ensure_list(entry.get("@type"))
@@ -204,8 +344,8 @@ def parse_event_page(html: str, url: str) -> EventItem:
             break
 
     # Title
-    h1 = soup.find(["h1","h2"])
-    if h1: item.titulo = norm_text(h1.get_text())
+    h1 = _first(tree, _XPATH_HEADING)
+    if h1 is not None: item.titulo = norm_text(h1.text_content())
     if event_ld:
         item.titulo = item.titulo or norm_text(event_ld.get("name"))
 
@@ -213,18 +353,16 @@ def parse_event_page(html: str, url: str) -> EventItem:
     # Look for labels or icon-text pairs
     # Many pages include "Región ..." or an address block
     # We'll gather text from common containers:
-    meta_blocks = []
-    for sel in ["section", "div"]:
-        for el in soup.select(f"{sel}.event-meta, {sel}.evento-meta, {sel}.meta, {sel}.event-info, {sel}.evento-info"):
-            meta_blocks.append(norm_text(el.get_text(" ")))
-    meta_blocks.extend(norm_text(el.get_text(" ")) for el in soup.select(".breadcrumb, .breadcrumbs, .chips, .tags, .event-tags"))
-    meta_blocks.extend(norm_text(el.get_text(" ")) for el in soup.select("address"))
-    page_text = norm_text(soup.get_text(" "))
-
-    # Ciudad/Región heuristic
-    m = re.search(r"Regi[oó]n\s+de\s+([A-Za-zÁÉÍÓÚÑñ\s]+)", page_text)
-    if m:
-        item.ciudad_region = "Región de " + m.group(1).strip()
+    meta_blocks = [_el_text(el) for el in tree.xpath(_XPATH_META_BLOCKS)]
+    page_text = norm_text(" ".join(tree.itertext()))
+
+    # Ciudad/Región heuristic: JSON-LD address wins; the "Región de ..." scan of
+    # page_text only runs when the first location entry doesn't answer it.
+    def region_from_text() -> str:
+        m = _RE_REGION.search(page_text)
+        return "Región de " + m.group(1).strip() if m else ""
+
+    region_text_checked = False
     if event_ld:
         location = event_ld.get("location")
         location_list = ensure_list(location)
@@ -246,20 +384,27 @@ def parse_event_page(html: str, url: str) -> EventItem:
                     item.lugar = addr_line
             if item.ciudad_region:
                 break
+            if not region_text_checked:
+                region_text_checked = True
+                item.ciudad_region = region_from_text()
+                if item.ciudad_region:
+                    break
+    if not item.ciudad_region and not region_text_checked:
+        item.ciudad_region = region_from_text()
     if not item.ciudad_region:
         for block in meta_blocks:
-            m_region = re.search(r"(Regi[oó]n(?:\s+de)?\s+[A-Za-zÁÉÍÓÚÑñ\s]+)", block)
+            m_region = _RE_REGION_META.search(block)
             if m_region:
                 item.ciudad_region = norm_text(m_region.group(1))
                 break
 
     # Lugar: look for "Lugar:" or similar
-    m2 = re.search(r"(Lugar|Ubicaci[oó]n)\s*:\s*(.+?)(?:\s{2,}|$)", page_text)
+    m2 = _RE_LUGAR.search(page_text)
     if m2:
         item.lugar = m2.group(2).strip()
     if not item.lugar:
         for block in meta_blocks:
-            m_loc = re.search(r"(Lugar|Ubicaci[oó]n)\s*[:\-]\s*(.+)", block, re.IGNORECASE)
+            m_loc = _RE_LUGAR_META.search(block)
             if m_loc:
                 item.lugar = m_loc.group(2).strip()
                 break
@@ -274,16 +419,17 @@ def parse_event_page(html: str, url: str) -> EventItem:
 
     # Description: take the first paragraph-like block under a description section
     desc = ""
-    for sel in ["#descripcion", ".descripcion", ".description", ".content", ".entry-content"]:
-        el = soup.select_one(sel)
-        if el:
-            desc = norm_text(el.get_text(" "))
+    for xpath in _XPATH_DESCRIPTION:
+        el = _first(tree, xpath)
+        if el is not None:
+            desc = _el_text(el)
             break
     if not desc:
         # fallback: first long paragraph
-        ps = [p for p in soup.find_all("p") if len(p.get_text(strip=True)) > 60]
-        if ps:
-            desc = norm_text(ps[0].get_text(" "))
+        for p in tree.iter("p"):
+            if len("".join(t.strip() for t in p.xpath(".//text()"))) > 60:
+                desc = _el_text(p)
+                break
     item.descripcion = desc
     if event_ld and event_ld.get("description"):
         ld_desc = norm_text(event_ld["description"])
@@ -293,22 +439,24 @@ def parse_event_page(html: str, url: str) -> EventItem:
     # Dates / times (heuristics)
     # We'll search for typical date blocks like "desde 28 oct" or "2025-10-28" etc.
     # Prefer machine-readable meta if available
-    dtstart = soup.find("time", {"itemprop": "startDate"}) or soup.find("time", {"datetime": True})
-    dtend   = soup.find("time", {"itemprop": "endDate"})
+    dtstart = _first(tree, _XPATH_TIME_START)
+    if dtstart is None:
+        dtstart = _first(tree, _XPATH_TIME_ANY)
+    dtend   = _first(tree, _XPATH_TIME_END)
     def split_dt(t: Optional[str]):
         if not t: return ("","")
         t = t.strip()
         # ISO like 2025-10-28T18:00
-        m = re.match(r"(\d{4}-\d{2}-\d{2})[T\s](\d{2}:\d{2})", t)
+        m = _RE_ISODT.match(t)
         if m: return (m.group(1), m.group(2))
         # Fallback: try to extract time like "18:00"
-        tm = re.search(r"(\d{1,2}:\d{2})", t)
-        d  = re.search(r"(\d{4}-\d{2}-\d{2})", t)
+        tm = _RE_TIME.search(t)
+        d  = _RE_DATE.search(t)
         return (d.group(1) if d else "", tm.group(1) if tm else "")
-    if dtstart and dtstart.has_attr("datetime"):
-        item.fecha_inicio, item.hora_inicio = split_dt(dtstart["datetime"])
-    if dtend and dtend.has_attr("datetime"):
-        item.fecha_fin, item.hora_fin = split_dt(dtend["datetime"])
+    if dtstart is not None and dtstart.get("datetime") is not None:
+        item.fecha_inicio, item.hora_inicio = split_dt(dtstart.get("datetime"))
+    if dtend is not None and dtend.get("datetime") is not None:
+        item.fecha_fin, item.hora_fin = split_dt(dtend.get("datetime"))
     if event_ld:
         if not item.fecha_inicio or not item.hora_inicio:
             start = event_ld.get("startDate")
@@ -323,38 +471,33 @@ def parse_event_page(html: str, url: str) -> EventItem:
                 item.fecha_fin = item.fecha_fin or end_date
                 item.hora_fin = item.hora_fin or end_time
 
-    # Precio / gratis
-    normalized_page = normalize_for_match(page_text)
-    badges = [normalize_for_match(norm_text(b.get_text(" "))) for b in soup.select(".badge, .tag, .chip, .etiqueta")]
-    item.es_gratis = any(keyword in normalized_page for keyword in FREE_KEYWORDS) or any(
-        "gratis" in badge or "liberada" in badge for badge in badges
-    )
-    # Try to capture a price line if present
-    mprice = re.search(r"(\$|clp)\s*\d[\d\.]*", page_text, re.IGNORECASE)
-    if mprice:
-        item.precio_info = mprice.group(0)
-    if item.es_gratis and not item.precio_info:
-        item.precio_info = "Gratis"
-    if event_ld:
-        offers = ensure_list(event_ld.get("offers"))
-        for offer in offers:
-            if not isinstance(offer, dict):
-                continue
-            price = offer.get("price")
-            if price in (None, "", "0", "0.0", 0, 0.0):
-                item.es_gratis = True
-                item.precio_info = item.precio_info or "Gratis"
-            elif isinstance(price, (int, float)):
-                item.precio_info = item.precio_info or f"{offer.get('priceCurrency','CLP')} {price}"
-            elif isinstance(price, str):
-                price_str = norm_text(price)
-                if price_str:
-                    item.precio_info = item.precio_info or price_str
+    # Precio / gratis. The badge check is cheap and always runs; the keyword
+    # scan of the whole (normalized) page text is skipped only when JSON-LD
+    # offers give a definitive nonzero price and no badge says it's free.
+    badge_text = normalize_for_match(norm_text(" ".join(tree.xpath(_XPATH_BADGE_TEXT))))
+    badge_free = _RE_FREE.search(badge_text) is not None
+    offers = [o for o in ensure_list(event_ld.get("offers")) if isinstance(o, dict)] if event_ld else []
+    priced_offers = [
+        o for o in offers
+        if isinstance(o.get("price"), (int, float)) or (isinstance(o.get("price"), str) and o["price"].strip())
+    ]
+    if priced_offers and not badge_free and all(o["price"] not in _FREE_PRICES for o in priced_offers):
+        _apply_offers(item, priced_offers)
+    else:
+        normalized_page = normalize_for_match(page_text)
+        item.es_gratis = badge_free or _RE_FREE.search(normalized_page) is not None
+        # Try to capture a price line if present
+        mprice = _RE_PRICE.search(page_text)
+        if mprice:
+            item.precio_info = mprice.group(0)
+        if item.es_gratis and not item.precio_info:
+            item.precio_info = "Gratis"
+        _apply_offers(item, offers)
 
     # If still missing location, try structured pieces near icons
     if not item.lugar:
         # look for an address-like line
-        maddr = re.search(r"(calle|plaza|teatro|museo|parque|biblioteca|centro cultural)[^\.]{10,80}", page_text, re.IGNORECASE)
+        maddr = _RE_ADDR.search(page_text)
         if maddr:
             item.lugar = norm_text(maddr.group(0))
 
@@ -371,12 +514,11 @@ def parse_event_page(html: str, url: str) -> EventItem:
                 json_blob_parts.extend(str(v) for v in loc.values() if isinstance(v, str))
         extra_blobs.append(" ".join(json_blob_parts))
     item.search_blob = " ".join(extra_blobs)
+    _cache_normalized(item)
     return item
 
 def event_to_dict(item: EventItem) -> Dict[str, str]:
-    data = asdict(item)
-    data.pop("search_blob", None)
-    return data
+    return dict(zip(EXPORT_FIELDS, _GET_EXPORT(item)))
 
 def build_listing_url(page:int=1, free_only:bool=False, region:Optional[str]=None) -> str:
     # Base listing supports query params. We know "free=on" works.
@@ -391,51 +533,69 @@ def build_listing_url(page:int=1, free_only:bool=False, region:Optional[str]=Non
     qs = ("?" + "&".join(params)) if params else ""
     return LISTING + qs
 
-def scrape(max_pages:int=3, free_only:bool=True, region:Optional[str]=None) -> List[EventItem]:
+async def _scrape_async(
+    max_pages: int, free_only: bool, region: Optional[str], parse_pool: Executor
+) -> Tuple[List[EventItem], int]:
     items: List[EventItem] = []
+    total_parsed = 0  # eventos parseados antes de eliminar duplicados
     page = 1
     next_url = build_listing_url(page=page, free_only=free_only, region=region)
 
     visited_links = set()
-
-    while next_url and page <= max_pages:
-        html = fetch(next_url)
-        if not html:
-            break
-        links = extract_event_links_from_listing(html)
-        # Visit each event page
-        for href in links:
-            if href in visited_links:
-                continue
-            visited_links.add(href)
-            ev_html = fetch(href)
-            if not ev_html:
-                continue
-            item = parse_event_page(ev_html, href)
-            items.append(item)
-        # Find next page
-        soup = BeautifulSoup(html, "html.parser")
-        next_link = find_next_page(soup)
-        next_url = next_link
-        page += 1
-    return items
+    seen_keys = set()
+    sem = asyncio.Semaphore(CONCURRENCY)
+    limiter = _RateLimiter(REQUEST_DELAY / CONCURRENCY)
+    loop = asyncio.get_running_loop()
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+
+    async with httpx.AsyncClient(headers=HEADERS, timeout=TIMEOUT, limits=limits, follow_redirects=True) as client:
+        while next_url and page <= max_pages:
+            listing = await fetch_async(client, next_url, sem, limiter)
+            if not listing:
+                break
+            # Un solo parseo del listado para links y paginación
+            tree = _parse_html(*listing)
+            links = [href for href in extract_event_links_from_listing(tree) if href not in visited_links]
+            visited_links.update(links)
+
+            # Visit event pages concurrently; parsing (CPU-bound) runs in worker processes
+            pages = await asyncio.gather(*(fetch_async(client, href, sem, limiter) for href in links))
+            parsed = await asyncio.gather(*(
+                loop.run_in_executor(parse_pool, parse_event_page, ev_page[0], href, ev_page[1])
+                for href, ev_page in zip(links, pages)
+                if ev_page
+            ))
+            total_parsed += len(parsed)
+            items.extend(deduplicate_items(parsed, seen_keys))
+
+            # Find next page
+            next_url = find_next_page(tree)
+            page += 1
+    return items, total_parsed
+
+def scrape(max_pages:int=3, free_only:bool=True, region:Optional[str]=None) -> Tuple[List[EventItem], int]:
+    # Returns the unique events plus how many were parsed before deduplication
+    # Pool created before the event loop; workers only receive bytes and return EventItem
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as parse_pool:
+        return asyncio.run(_scrape_async(max_pages, free_only, region, parse_pool))
+
+def export_rows(items: List[EventItem]) -> List[Tuple[Any, ...]]:
+    # Tuples in EXPORT_FIELDS order, without asdict's recursive copy
+    return list(map(_GET_EXPORT, items))
 
 def write_excel(items: List[EventItem], out_path: str):
     try:
         import pandas as pd
     except ImportError:
         raise SystemExit("Pandas no está instalado. Ejecuta: pip install pandas openpyxl")
-    data = [event_to_dict(i) for i in items]
-    df = pd.DataFrame(data, columns=EXPORT_FIELDS)
+    df = pd.DataFrame.from_records(export_rows(items), columns=EXPORT_FIELDS)
     df.to_excel(out_path, index=False)
 
 def write_csv(items: List[EventItem], out_path: str):
-    fieldnames = EXPORT_FIELDS
     with open(out_path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        for it in items:
-            w.writerow(event_to_dict(it))
+        w = csv.writer(f)
+        w.writerow(EXPORT_FIELDS)
+        w.writerows(export_rows(items))
 
 def main():
     ap = argparse.ArgumentParser(description="Scrape ChileCultura events to Excel/CSV")
@@ -457,13 +617,10 @@ def main():
     if not region_for_listing and original_terms:
         region_for_listing = original_terms[0]
 
-    items = scrape(max_pages=args.max_pages, free_only=args.free, region=region_for_listing)
-    total_scraped = len(items)
+    items, total_scraped = scrape(max_pages=args.max_pages, free_only=args.free, region=region_for_listing)
     if not total_scraped:
         print("No se encontraron eventos en la paginación consultada.")
         return
-
-    items = deduplicate_items(items)
     after_dedup = len(items)
 
     if normalized_terms:
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Los scripts (scrape_*, import_*) viven en la raíz de jubilapp-api-py, no en un paquete.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("lxml")
+pytest.importorskip("httpx")
+pytest.importorskip("requests")
+
+from scrape_chilecultura_to_excel import parse_event_page  # noqa: E402
+
+_PAGE = """
+<html><head>
+<script type="application/ld+json">
+{{"@type": "Event", "name": "Concierto", "offers": {{"price": "{price}", "priceCurrency": "CLP"}}}}
+</script>
+</head><body>
+<h1>Concierto</h1>
+{badge}
+<p>{text}</p>
+</body></html>
+"""
+
+
+def _page(price: str, badge: str = "", text: str = "Un concierto en el parque.") -> str:
+    return _PAGE.format(price=price, badge=badge, text=text)
+
+
+def test_priced_offer_with_free_badge_stays_free():
+    html = _page("5000", badge='<span class="badge">Gratis</span>', text="Entrada liberada para todo público.")
+    item = parse_event_page(html, "https://chilecultura.gob.cl/events/1/")
+    assert item.es_gratis is True
+
+
+def test_priced_offer_without_free_hints_uses_offer_price():
+    item = parse_event_page(_page("5000"), "https://chilecultura.gob.cl/events/2/")
+    assert item.es_gratis is False
+    assert item.precio_info == "5000"
+
+
+def test_zero_price_offer_is_free():
+    item = parse_event_page(_page("0"), "https://chilecultura.gob.cl/events/3/")
+    assert item.es_gratis is True
+    assert item.precio_info == "Gratis"